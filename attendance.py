@@ -1,21 +1,21 @@
+import time
+
+startup_began = time.perf_counter()
+
 import tkinter as tk
 from tkinter import *
-import os, cv2
-import shutil
-import csv
-import numpy as np
+import os
 from PIL import ImageTk, Image
-import pandas as pd
-import datetime
-import time
 import tkinter.font as font
-import pyttsx3
 
 # project module
-import show_attendance
-import takeImage
-import trainImage
-import automaticAttedance
+# the feature modules pull in OpenCV and pandas, so they are imported on
+# first use (or warmed up after the window is shown) instead of here
+from lazy_modules import LazyModules
+from speech import get_speech
+
+modules = LazyModules()
+feature_modules = ["takeImage", "trainImage", "automaticAttedance", "show_attendance"]
 
 # engine = pyttsx3.init()
 # engine.say("Welcome!")
@@ -24,9 +24,8 @@ import automaticAttedance
 
 
 def text_to_speech(user_text):
-    engine = pyttsx3.init()
-    engine.say(user_text)
-    engine.runAndWait()
+    # queued on the speech thread, never blocks the window or the camera
+    get_speech().say(user_text)
 
 
 haarcasecade_path = "haarcascade_frontalface_default.xml"
@@ -41,316 +40,349 @@ studentdetail_path = (
     "./StudentDetails/studentdetails.csv"
 )
 attendance_path = "Attendance"
-
-window = Tk()
-window.title("Face Recognizer")
-window.geometry("1280x720")
-dialog_title = "QUIT"
-dialog_text = "Are you sure want to close?"
-window.configure(background="#1c1c1c")  # Dark theme
-
-
-# to destroy screen
-def del_sc1():
-    sc1.destroy()
-
-
-# error message for name and no
-def err_screen():
-    global sc1
-    sc1 = tk.Tk()
-    sc1.geometry("400x110")
-    sc1.iconbitmap("AMS.ico")
-    sc1.title("Warning!!")
-    sc1.configure(background="#1c1c1c")
-    sc1.resizable(0, 0)
-    tk.Label(
-        sc1,
-        text="Enrollment & Name required!!!",
-        fg="yellow",
-        bg="#1c1c1c",  # Dark background for the error window
-        font=("Verdana", 16, "bold"),
-    ).pack()
-    tk.Button(
-        sc1,
-        text="OK",
-        command=del_sc1,
-        fg="yellow",
-        bg="#333333",  # Darker button color
-        width=9,
-        height=1,
-        activebackground="red",
-        font=("Verdana", 16, "bold"),
-    ).place(x=110, y=50)
-
-def testVal(inStr, acttyp):
-    if acttyp == "1":  # insert
-        if not inStr.isdigit():
-            return False
-    return True
-
-
-logo = Image.open("UI_Image/0001.png")
-logo = logo.resize((50, 47), Image.LANCZOS)
-logo1 = ImageTk.PhotoImage(logo)
-titl = tk.Label(window, bg="#1c1c1c", relief=RIDGE, bd=10, font=("Verdana", 30, "bold"))
-titl.pack(fill=X)
-l1 = tk.Label(window, image=logo1, bg="#1c1c1c",)
-l1.place(x=470, y=10)
-
-
-titl = tk.Label(
-    window, text="Made By Graphians", bg="#1c1c1c", fg="yellow", font=("Verdana", 27, "bold"),
-)
-titl.place(x=525, y=12)
-
-a = tk.Label(
-    window,
-    text="Automatic Attedance System",
-    bg="#1c1c1c",  # Dark background for the main text
-    fg="yellow",  # Bright yellow text color
-    bd=10,
-    font=("Sherif", 35, "bold"),
-)
-a.pack()
-
-
-ri = Image.open("UI_Image/register.png")
-r = ImageTk.PhotoImage(ri)
-label1 = Label(window, image=r)
-label1.image = r
-label1.place(x=100, y=270)
-
-ai = Image.open("UI_Image/attendance.png")
-a = ImageTk.PhotoImage(ai)
-label2 = Label(window, image=a)
-label2.image = a
-label2.place(x=980, y=270)
-
-vi = Image.open("UI_Image/verifyy.png")
-v = ImageTk.PhotoImage(vi)
-label3 = Label(window, image=v)
-label3.image = v
-label3.place(x=600, y=270)
-
-
-def TakeImageUI():
-    ImageUI = Tk()
-    ImageUI.title("Take Student Image..")
-    ImageUI.geometry("780x480")
-    ImageUI.configure(background="#1c1c1c")  # Dark background for the image window
-    ImageUI.resizable(0, 0)
-    titl = tk.Label(ImageUI, bg="#1c1c1c", relief=RIDGE, bd=10, font=("Verdana", 30, "bold"))
+# processes used to preprocess training images
+train_workers = os.cpu_count() or 1
+# store each student's samples as one packed archive instead of loose JPEGs
+packed_training_images = False
+
+# processes spawned for parallel training re-import this module, so the
+# window is only built when it is run as the program
+if __name__ == "__main__":
+    window = Tk()
+    window.title("Face Recognizer")
+    window.geometry("1280x720")
+    dialog_title = "QUIT"
+    dialog_text = "Are you sure want to close?"
+    window.configure(background="#1c1c1c")  # Dark theme
+
+
+    # to destroy screen
+    def del_sc1():
+        sc1.destroy()
+
+
+    # error message for name and no
+    def err_screen():
+        global sc1
+        sc1 = tk.Tk()
+        sc1.geometry("400x110")
+        sc1.iconbitmap("AMS.ico")
+        sc1.title("Warning!!")
+        sc1.configure(background="#1c1c1c")
+        sc1.resizable(0, 0)
+        tk.Label(
+            sc1,
+            text="Enrollment & Name required!!!",
+            fg="yellow",
+            bg="#1c1c1c",  # Dark background for the error window
+            font=("Verdana", 16, "bold"),
+        ).pack()
+        tk.Button(
+            sc1,
+            text="OK",
+            command=del_sc1,
+            fg="yellow",
+            bg="#333333",  # Darker button color
+            width=9,
+            height=1,
+            activebackground="red",
+            font=("Verdana", 16, "bold"),
+        ).place(x=110, y=50)
+
+    def testVal(inStr, acttyp):
+        if acttyp == "1":  # insert
+            if not inStr.isdigit():
+                return False
+        return True
+
+
+    logo = Image.open("UI_Image/0001.png")
+    logo = logo.resize((50, 47), Image.LANCZOS)
+    logo1 = ImageTk.PhotoImage(logo)
+    titl = tk.Label(window, bg="#1c1c1c", relief=RIDGE, bd=10, font=("Verdana", 30, "bold"))
     titl.pack(fill=X)
-    # image and title
+    l1 = tk.Label(window, image=logo1, bg="#1c1c1c",)
+    l1.place(x=470, y=10)
+
+
     titl = tk.Label(
-        ImageUI, text="Register Your Face", bg="#1c1c1c", fg="green", font=("Verdana", 30, "bold"),
+        window, text="Made By Graphians", bg="#1c1c1c", fg="yellow", font=("Verdana", 27, "bold"),
     )
-    titl.place(x=270, y=12)
+    titl.place(x=525, y=12)
 
-    # heading
     a = tk.Label(
-        ImageUI,
-        text="Enter the details",
-        bg="#1c1c1c",  # Dark background for the details label
+        window,
+        text="Automatic Attedance System",
+        bg="#1c1c1c",  # Dark background for the main text
         fg="yellow",  # Bright yellow text color
         bd=10,
-        font=("Verdana", 24, "bold"),
+        font=("Sherif", 35, "bold"),
     )
-    a.place(x=280, y=75)
+    a.pack()
+
+
+    ri = Image.open("UI_Image/register.png")
+    r = ImageTk.PhotoImage(ri)
+    label1 = Label(window, image=r)
+    label1.image = r
+    label1.place(x=100, y=270)
+
+    ai = Image.open("UI_Image/attendance.png")
+    a = ImageTk.PhotoImage(ai)
+    label2 = Label(window, image=a)
+    label2.image = a
+    label2.place(x=980, y=270)
+
+    vi = Image.open("UI_Image/verifyy.png")
+    v = ImageTk.PhotoImage(vi)
+    label3 = Label(window, image=v)
+    label3.image = v
+    label3.place(x=600, y=270)
+
+
+    def TakeImageUI():
+        ImageUI = Tk()
+        ImageUI.title("Take Student Image..")
+        ImageUI.geometry("780x480")
+        ImageUI.configure(background="#1c1c1c")  # Dark background for the image window
+        ImageUI.resizable(0, 0)
+        titl = tk.Label(ImageUI, bg="#1c1c1c", relief=RIDGE, bd=10, font=("Verdana", 30, "bold"))
+        titl.pack(fill=X)
+        # image and title
+        titl = tk.Label(
+            ImageUI, text="Register Your Face", bg="#1c1c1c", fg="green", font=("Verdana", 30, "bold"),
+        )
+        titl.place(x=270, y=12)
+
+        # heading
+        a = tk.Label(
+            ImageUI,
+            text="Enter the details",
+            bg="#1c1c1c",  # Dark background for the details label
+            fg="yellow",  # Bright yellow text color
+            bd=10,
+            font=("Verdana", 24, "bold"),
+        )
+        a.place(x=280, y=75)
+
+        # ER no
+        lbl1 = tk.Label(
+            ImageUI,
+            text="Enrollment No",
+            width=10,
+            height=2,
+            bg="#1c1c1c",
+            fg="yellow",
+            bd=5,
+            relief=RIDGE,
+            font=("Verdana", 14),
+        )
+        lbl1.place(x=120, y=130)
+        txt1 = tk.Entry(
+            ImageUI,
+            width=17,
+            bd=5,
+            validate="key",
+            bg="#333333",  # Dark input background
+            fg="yellow",  # Bright text color for input
+            relief=RIDGE,
+            font=("Verdana", 18, "bold"),
+        )
+        txt1.place(x=250, y=130)
+        txt1["validatecommand"] = (txt1.register(testVal), "%P", "%d")
+
+        # name
+        lbl2 = tk.Label(
+            ImageUI,
+            text="Name",
+            width=10,
+            height=2,
+            bg="#1c1c1c",
+            fg="yellow",
+            bd=5,
+            relief=RIDGE,
+            font=("Verdana", 14),
+        )
+        lbl2.place(x=120, y=200)
+        txt2 = tk.Entry(
+            ImageUI,
+            width=17,
+            bd=5,
+            bg="#333333",  # Dark input background
+            fg="yellow",  # Bright text color for input
+            relief=RIDGE,
+            font=("Verdana", 18, "bold"),
+        )
+        txt2.place(x=250, y=200)
+
+        lbl3 = tk.Label(
+            ImageUI,
+            text="Notification",
+            width=10,
+            height=2,
+            bg="#1c1c1c",
+            fg="yellow",
+            bd=5,
+            relief=RIDGE,
+            font=("Verdana", 14),
+        )
+        lbl3.place(x=120, y=270)
+
+        message = tk.Label(
+            ImageUI,
+            text="",
+            width=32,
+            height=2,
+            bd=5,
+            bg="#333333",  # Dark background for messages
+            fg="yellow",  # Bright text color for messages
+            relief=RIDGE,
+            font=("Verdana", 14, "bold"),
+        )
+        message.place(x=250, y=270)
+
+        def take_image():
+            l1 = txt1.get()
+            l2 = txt2.get()
+            modules.get("takeImage").TakeImage(
+                l1,
+                l2,
+                haarcasecade_path,
+                trainimage_path,
+                message,
+                err_screen,
+                text_to_speech,
+                packed=packed_training_images,
+            )
+            txt1.delete(0, "end")
+            txt2.delete(0, "end")
+
+        # take Image button
+        # image
+        takeImg = tk.Button(
+            ImageUI,
+            text="Take Image",
+            command=take_image,
+            bd=10,
+            font=("Verdana", 18, "bold"),
+            bg="#333333",  # Dark background for the button
+            fg="yellow",  # Bright text color for the button
+            height=2,
+            width=12,
+            relief=RIDGE,
+        )
+        takeImg.place(x=130, y=350)
+
+        # full rebuild instead of adding only the new images to the model
+        full_rebuild = tk.BooleanVar(master=ImageUI, value=False)
+
+        def train_image():
+            modules.get("trainImage").TrainImage(
+                haarcasecade_path,
+                trainimage_path,
+                trainimagelabel_path,
+                message,
+                text_to_speech,
+                full_rebuild=full_rebuild.get(),
+                workers=train_workers,
+            )
+
+        # train Image function call
+        trainImg = tk.Button(
+            ImageUI,
+            text="Train Image",
+            command=train_image,
+            bd=10,
+            font=("Verdana", 18, "bold"),
+            bg="#333333",  # Dark background for the button
+            fg="yellow",  # Bright text color for the button
+            height=2,
+            width=12,
+            relief=RIDGE,
+        )
+        trainImg.place(x=360, y=350)
+
+        rebuild = tk.Checkbutton(
+            ImageUI,
+            text="Full rebuild",
+            variable=full_rebuild,
+            bg="#1c1c1c",
+            fg="yellow",
+            selectcolor="#333333",
+            activebackground="#1c1c1c",
+            font=("Verdana", 12),
+        )
+        rebuild.place(x=610, y=375)
 
-    # ER no
-    lbl1 = tk.Label(
-        ImageUI,
-        text="Enrollment No",
-        width=10,
-        height=2,
-        bg="#1c1c1c",
+
+    r = tk.Button(
+        window,
+        text="Register ",
+        command=TakeImageUI,
+        bd=10,
+        font=("Verdana", 16),
+        bg="red",
         fg="yellow",
-        bd=5,
-        relief=RIDGE,
-        font=("Verdana", 14),
-    )
-    lbl1.place(x=120, y=130)
-    txt1 = tk.Entry(
-        ImageUI,
-        width=17,
-        bd=5,
-        validate="key",
-        bg="#333333",  # Dark input background
-        fg="yellow",  # Bright text color for input
-        relief=RIDGE,
-        font=("Verdana", 18, "bold"),
-    )
-    txt1.place(x=250, y=130)
-    txt1["validatecommand"] = (txt1.register(testVal), "%P", "%d")
-
-    # name
-    lbl2 = tk.Label(
-        ImageUI,
-        text="Name",
-        width=10,
         height=2,
-        bg="#1c1c1c",
-        fg="yellow",
-        bd=5,
-        relief=RIDGE,
-        font=("Verdana", 14),
-    )
-    lbl2.place(x=120, y=200)
-    txt2 = tk.Entry(
-        ImageUI,
         width=17,
-        bd=5,
-        bg="#333333",  # Dark input background
-        fg="yellow",  # Bright text color for input
-        relief=RIDGE,
-        font=("Verdana", 18, "bold"),
     )
-    txt2.place(x=250, y=200)
+    r.place(x=100, y=520)
 
-    lbl3 = tk.Label(
-        ImageUI,
-        text="Notification",
-        width=10,
-        height=2,
-        bg="#1c1c1c",
-        fg="yellow",
-        bd=5,
-        relief=RIDGE,
-        font=("Verdana", 14),
-    )
-    lbl3.place(x=120, y=270)
 
-    message = tk.Label(
-        ImageUI,
-        text="",
-        width=32,
-        height=2,
-        bd=5,
-        bg="#333333",  # Dark background for messages
-        fg="yellow",  # Bright text color for messages
-        relief=RIDGE,
-        font=("Verdana", 14, "bold"),
-    )
-    message.place(x=250, y=270)
-
-    def take_image():
-        l1 = txt1.get()
-        l2 = txt2.get()
-        takeImage.TakeImage(
-            l1,
-            l2,
-            haarcasecade_path,
-            trainimage_path,
-            message,
-            err_screen,
-            text_to_speech,
-        )
-        txt1.delete(0, "end")
-        txt2.delete(0, "end")
-
-    # take Image button
-    # image
-    takeImg = tk.Button(
-        ImageUI,
-        text="Take Image",
-        command=take_image,
-        bd=10,
-        font=("Verdana", 18, "bold"),
-        bg="#333333",  # Dark background for the button
-        fg="yellow",  # Bright text color for the button
-        height=2,
-        width=12,
-        relief=RIDGE,
-    )
-    takeImg.place(x=130, y=350)
-
-    def train_image():
-        trainImage.TrainImage(
-            haarcasecade_path,
-            trainimage_path,
-            trainimagelabel_path,
-            message,
-            text_to_speech,
-        )
+    def automatic_attedance():
+        modules.get("automaticAttedance").subjectChoose(text_to_speech)
+
 
-    # train Image function call
-    trainImg = tk.Button(
-        ImageUI,
-        text="Train Image",
-        command=train_image,
+    r = tk.Button(
+        window,
+        text="Take Attendance",
+        command=automatic_attedance,
         bd=10,
-        font=("Verdana", 18, "bold"),
-        bg="#333333",  # Dark background for the button
-        fg="yellow",  # Bright text color for the button
+        font=("Verdana", 16),
+        bg="red",
+        fg="yellow",
         height=2,
-        width=12,
-        relief=RIDGE,
+        width=17,
     )
-    trainImg.place(x=360, y=350)
-
-
-r = tk.Button(
-    window,
-    text="Register ",
-    command=TakeImageUI,
-    bd=10,
-    font=("Verdana", 16),
-    bg="red",
-    fg="yellow",
-    height=2,
-    width=17,
-)
-r.place(x=100, y=520)
-
-
-def automatic_attedance():
-    automaticAttedance.subjectChoose(text_to_speech)
-
-
-r = tk.Button(
-    window,
-    text="Take Attendance",
-    command=automatic_attedance,
-    bd=10,
-    font=("Verdana", 16),
-    bg="red",
-    fg="yellow",
-    height=2,
-    width=17,
-)
-r.place(x=600, y=520)
+    r.place(x=600, y=520)
 
 
-def view_attendance():
-    show_attendance.subjectchoose(text_to_speech)
+    def view_attendance():
+        modules.get("show_attendance").subjectchoose(text_to_speech)
 
 
-r = tk.Button(
-    window,
-    text="View Attendance",
-    command=view_attendance,
-    bd=10,
-    font=("Verdana", 16),
-    bg="red",
-    fg="yellow",
-    height=2,
-    width=17,
-)
-r.place(x=1000, y=520)
-r = tk.Button(
-    window,
-    text="EXIT",
-    bd=10,
-    command=quit,
-    font=("Verdana", 16),
-    bg="black",
-    fg="yellow",
-    height=2,
-    width=17,
-)
-r.place(x=600, y=660)
-
+    r = tk.Button(
+        window,
+        text="View Attendance",
+        command=view_attendance,
+        bd=10,
+        font=("Verdana", 16),
+        bg="red",
+        fg="yellow",
+        height=2,
+        width=17,
+    )
+    r.place(x=1000, y=520)
+    r = tk.Button(
+        window,
+        text="EXIT",
+        bd=10,
+        command=quit,
+        font=("Verdana", 16),
+        bg="black",
+        fg="yellow",
+        height=2,
+        width=17,
+    )
+    r.place(x=600, y=660)
+
+    def window_shown():
+        print(f"Window shown {time.perf_counter() - startup_began:.2f}s after start")
+        get_speech()
+        modules.warm(
+            feature_modules,
+            done=lambda report: print(f"Feature modules loaded in background: {report}"),
+        )
 
-window.mainloop()
+    window.after_idle(window_shown)
+    window.mainloop()
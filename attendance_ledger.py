@@ -0,0 +1,105 @@
+import datetime
+import os
+import time
+
+import pandas as pd
+
+
+class LedgerEntry:
+    """What the session knows about one recognized student"""
+
+    __slots__ = ("enrollment", "name", "first_seen", "best_conf", "hits")
+
+    def __init__(self, enrollment, name, first_seen, conf):
+        self.enrollment = enrollment
+        self.name = name
+        self.first_seen = first_seen
+        self.best_conf = conf
+        self.hits = 1
+
+
+class AttendanceLedger:
+    """Students seen during one attendance session, keyed by enrollment.
+
+    record() is a dict lookup, so it is cheap enough to call for every match in
+    the recognition loop. The ledger is turned into a DataFrame only once, when
+    the session is saved.
+    """
+
+    def __init__(self):
+        self.entries = {}
+
+    def record(self, enrollment, name, conf, ts=None):
+        """Count a match; returns True the first time a student is seen"""
+        entry = self.entries.get(enrollment)
+        if entry is None:
+            self.entries[enrollment] = LedgerEntry(
+                enrollment, name, ts if ts is not None else time.time(), conf
+            )
+            return True
+        entry.hits += 1
+        # LBPH confidence is a distance: lower is better
+        if conf < entry.best_conf:
+            entry.best_conf = conf
+        return False
+
+    def merge(self, other):
+        """Fold another session's ledger (e.g. a second camera) into this one"""
+        for theirs in other:
+            entry = self.entries.get(theirs.enrollment)
+            if entry is None:
+                entry = self.entries[theirs.enrollment] = LedgerEntry(
+                    theirs.enrollment, theirs.name, theirs.first_seen, theirs.best_conf
+                )
+                entry.hits = theirs.hits
+                continue
+            entry.hits += theirs.hits
+            entry.first_seen = min(entry.first_seen, theirs.first_seen)
+            entry.best_conf = min(entry.best_conf, theirs.best_conf)
+            if not entry.name:
+                entry.name = theirs.name
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, enrollment):
+        return enrollment in self.entries
+
+    def __iter__(self):
+        return iter(self.entries.values())
+
+    def to_dataframe(self, date, details=False):
+        """Enrollment, Name and a <date> column of 1s, in first-seen order.
+
+        With details=True the first-seen time, best confidence and hit count
+        are added as extra columns.
+        """
+        entries = sorted(self.entries.values(), key=lambda e: e.first_seen)
+        df = pd.DataFrame({
+            "Enrollment": [e.enrollment for e in entries],
+            "Name": [e.name for e in entries],
+        })
+        df[date] = 1
+        if details:
+            df["First_Seen"] = [
+                datetime.datetime.fromtimestamp(e.first_seen).strftime("%H:%M:%S")
+                for e in entries
+            ]
+            df["Confidence"] = [round(e.best_conf, 2) for e in entries]
+            df["Hits"] = [e.hits for e in entries]
+        return df
+
+    def to_csv(self, fileName, date, details=False):
+        df = self.to_dataframe(date, details)
+        df.to_csv(fileName, index=False)
+        return df
+
+    def save_session(self, attendance_path, subject, ts=None):
+        """Write Attendance/<subject>/<subject>_<date>_<H-M-S>.csv, returns (fileName, df)"""
+        ts = ts if ts is not None else time.time()
+        date = datetime.datetime.fromtimestamp(ts).strftime("%Y-%m-%d")
+        timeStamp = datetime.datetime.fromtimestamp(ts).strftime("%H-%M-%S")
+        path = os.path.join(attendance_path, subject)
+        os.makedirs(path, exist_ok=True)
+        fileName = os.path.join(path, f"{subject}_{date}_{timeStamp}.csv")
+        return fileName, self.to_csv(fileName, date)
@@ -0,0 +1,206 @@
+import datetime
+import os
+import sqlite3
+import threading
+import time
+
+import pandas as pd
+
+
+attendance_store_path = os.path.join("Attendance", "attendance.db")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    subject TEXT NOT NULL,
+    recorded_at TEXT NOT NULL,
+    source TEXT UNIQUE
+);
+CREATE TABLE IF NOT EXISTS attendance (
+    session_id INTEGER NOT NULL REFERENCES sessions(id) ON DELETE CASCADE,
+    subject TEXT NOT NULL,
+    date TEXT NOT NULL,
+    enrollment TEXT NOT NULL,
+    name TEXT NOT NULL DEFAULT '',
+    status TEXT NOT NULL DEFAULT 'Present',
+    first_seen TEXT,
+    confidence REAL,
+    PRIMARY KEY (session_id, enrollment)
+);
+-- bumped on every add or removal; rowids of deleted sessions get reused
+CREATE TABLE IF NOT EXISTS subject_changes (
+    subject TEXT PRIMARY KEY,
+    changes INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_attendance_subject_date
+    ON attendance (subject, date, enrollment);
+CREATE INDEX IF NOT EXISTS idx_sessions_subject
+    ON sessions (subject, recorded_at);
+"""
+
+
+class AttendanceStore:
+    """All attendance in one indexed SQLite database instead of a CSV per session.
+
+    Rows are keyed by subject, date and enrollment; each session keeps its exact
+    recording time. Viewers query one subject at a time and CSV export is
+    still available through export_csv().
+    """
+
+    def __init__(self, path=attendance_store_path):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        self.conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+
+    def add_session(self, subject, recorded_at, rows, source=None):
+        """Store one session; rows are (enrollment, name, status, first_seen, confidence).
+
+        A session with the same source (e.g. an imported sheet) replaces the
+        previous import of it.
+        """
+        if isinstance(recorded_at, (int, float)):
+            recorded_at = datetime.datetime.fromtimestamp(recorded_at)
+        if isinstance(recorded_at, datetime.datetime):
+            recorded_at = recorded_at.strftime("%Y-%m-%d %H:%M:%S")
+        date = recorded_at[:10]
+        with self._lock, self.conn:
+            if source is not None:
+                self.conn.execute("DELETE FROM sessions WHERE source = ?", (source,))
+            cur = self.conn.execute(
+                "INSERT INTO sessions (subject, recorded_at, source) VALUES (?, ?, ?)",
+                (subject, recorded_at, source),
+            )
+            session_id = cur.lastrowid
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO attendance "
+                "(session_id, subject, date, enrollment, name, status, first_seen, confidence) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (session_id, subject, date, str(enrollment), name or "", status or "Present",
+                     first_seen, confidence)
+                    for enrollment, name, status, first_seen, confidence in rows
+                ],
+            )
+            self._bump(subject)
+        return session_id
+
+    def add_ledger(self, subject, ledger, recorded_at, source=None):
+        """Store an automatic session from an AttendanceLedger"""
+        rows = [
+            (
+                entry.enrollment,
+                entry.name,
+                "Present",
+                datetime.datetime.fromtimestamp(entry.first_seen).strftime("%H:%M:%S"),
+                float(entry.best_conf),
+            )
+            for entry in ledger
+        ]
+        return self.add_session(subject, recorded_at, rows, source)
+
+    def has_source(self, source):
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT 1 FROM sessions WHERE source = ?", (source,)
+            ).fetchone()
+        return row is not None
+
+    def remove_source(self, source):
+        with self._lock, self.conn:
+            subjects = [r[0] for r in self.conn.execute(
+                "SELECT DISTINCT subject FROM sessions WHERE source = ?", (source,)
+            )]
+            self.conn.execute("DELETE FROM sessions WHERE source = ?", (source,))
+            for subject in subjects:
+                self._bump(subject)
+
+    def _bump(self, subject):
+        self.conn.execute(
+            "INSERT INTO subject_changes (subject, changes) VALUES (?, 1) "
+            "ON CONFLICT(subject) DO UPDATE SET changes = changes + 1",
+            (subject,),
+        )
+
+    def subjects(self):
+        with self._lock:
+            return [r[0] for r in self.conn.execute(
+                "SELECT DISTINCT subject FROM sessions ORDER BY subject"
+            )]
+
+    def query(self, subject, date_from=None, date_to=None, enrollment=None):
+        """Recorded_At, Enrollment, Name, Date, Status rows of one subject"""
+        sql = (
+            "SELECT s.recorded_at AS Recorded_At, a.enrollment AS Enrollment, "
+            "a.name AS Name, a.date AS Date, a.status AS Status "
+            "FROM attendance a JOIN sessions s ON s.id = a.session_id "
+            "WHERE a.subject = ?"
+        )
+        params = [subject]
+        if date_from:
+            sql += " AND a.date >= ?"
+            params.append(date_from)
+        if date_to:
+            sql += " AND a.date <= ?"
+            params.append(date_to)
+        if enrollment is not None:
+            sql += " AND a.enrollment = ?"
+            params.append(str(enrollment))
+        sql += " ORDER BY s.recorded_at, a.enrollment"
+        with self._lock:
+            return pd.read_sql_query(sql, self.conn, params=params)
+
+    def version(self, subject):
+        """(sessions, changes) of the subject; changes grows on every add, replace or removal"""
+        with self._lock:
+            return self.conn.execute(
+                "SELECT (SELECT COUNT(*) FROM sessions WHERE subject = ?), "
+                "COALESCE((SELECT changes FROM subject_changes WHERE subject = ?), 0)",
+                (subject, subject),
+            ).fetchone()
+
+    def export_csv(self, subject, fileName, **filters):
+        df = self.query(subject, **filters)
+        os.makedirs(os.path.dirname(fileName) or ".", exist_ok=True)
+        df.to_csv(fileName, index=False)
+        return df
+
+    def close(self):
+        self.conn.close()
+
+
+_stores = {}
+_lock = threading.Lock()
+
+
+def get_store(path=attendance_store_path):
+    """Shared store for a database file"""
+    key = os.path.abspath(path)
+    with _lock:
+        store = _stores.get(key)
+        if store is None:
+            store = _stores[key] = AttendanceStore(path)
+        return store
+
+
+def save_session(ledger, subject, ts=None, attendance_path="Attendance", write_csv=False,
+                 store=None):
+    """Store a recognized session, optionally also as a per-session sheet.
+
+    Returns (sheet file name or None, DataFrame of the session). A sheet
+    written here is registered as the session's source, so the viewer does
+    not import it a second time.
+    """
+    ts = ts if ts is not None else time.time()
+    store = store or get_store(os.path.join(attendance_path, "attendance.db"))
+    date = datetime.datetime.fromtimestamp(ts).strftime("%Y-%m-%d")
+    fileName = None
+    if write_csv:
+        fileName, attendance = ledger.save_session(attendance_path, subject, ts)
+    else:
+        attendance = ledger.to_dataframe(date)
+    store.add_ledger(subject, ledger, ts, source=os.path.abspath(fileName) if fileName else None)
+    return fileName, attendance
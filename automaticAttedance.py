@@ -2,15 +2,23 @@ import tkinter as tk
 from tkinter import *
 import os, cv2
 import shutil
-import csv
 import numpy as np
 from PIL import ImageTk, Image
-import pandas as pd
-import datetime
 import time
 import tkinter.ttk as tkk
 import tkinter.font as font
 
+from attendance_ledger import AttendanceLedger
+from attendance_store import get_store, save_session
+from face_detection import detection_config
+from face_tracker import FaceTracker
+from frame_sources import open_source
+from metrics import Metrics
+from model_manager import get_model_manager
+import multi_camera
+from recognition_pipeline import RecognitionPipeline, default_workers
+from subject_roster import load_roster
+
 haarcasecade_path = "haarcascade_frontalface_default.xml"
 trainimagelabel_path = (
     "TrainingImageLabel\\Trainner.yml"
@@ -20,8 +28,92 @@ studentdetail_path = (
     "StudentDetails\\studentdetails.csv"
 )
 attendance_path = "Attendance"
+# "full" runs the cascade on the whole camera frame, "fast" on a half-size copy
+detection_mode = "fast"
+# usual face width in camera pixels, e.g. 80 for a classroom camera; the
+# cascade then only tries a third to three times this size. None searches
+# every size, the safe choice until the setup has been measured
+expected_face_size = None
+# camera indexes or stream URLs; more than one runs a process per camera
+camera_sources = [0]
+# sessions go to Attendance/attendance.db; True also writes one sheet per session
+session_csv = False
+# only match faces against the subject's roster (StudentDetails/rosters/<subject>.csv)
+roster_scoped = True
+# frame rate to hold when many faces are in view, by running the full face
+# search less often; None runs it on every frame
+target_fps = 15
+
+
+def fill_from_camera(source, recognizer, registry, future, detectors=None):
+    """Recognize students on one camera until the deadline, showing a preview"""
+    metrics = Metrics("attendance")
+    with metrics.time("open"):
+        cam = open_source(source)
+    font = cv2.FONT_HERSHEY_SIMPLEX
+    ledger = AttendanceLedger()
+    pipeline = RecognitionPipeline(
+        cam,
+        haarcasecade_path,
+        recognizer,
+        workers=len(detectors) if detectors else None,
+        tracker=FaceTracker(),
+        detection=detection_config(detection_mode, expected_face_size),
+        detectors=detectors,
+        metrics=metrics,
+        target_fps=target_fps,
+    )
+    pipeline.start()
+    try:
+        for im, found in pipeline.results(future):
+            with metrics.time("draw"):
+                for (x, y, w, h, Id, conf) in found:
+                    metrics.record("confidence", conf)
+                    if conf < 70:
+                        metrics.count("recognized")
+                        aa = registry.name(Id)
+                        tt = str(Id) + "-" + aa
+                        ledger.record(Id, aa, conf)
+                        if im is None:
+                            continue
+                        cv2.rectangle(im, (x, y), (x + w, y + h), (0, 260, 0), 4)
+                        cv2.putText(
+                            im, str(tt), (x + h, y), font, 1, (255, 255, 0,), 4
+                        )
+                    else:
+                        metrics.count("unknown")
+                        Id = "Unknown"
+                        tt = str(Id)
+                        if im is None:
+                            continue
+                        cv2.rectangle(im, (x, y), (x + w, y + h), (0, 25, 255), 7)
+                        cv2.putText(
+                            im, str(tt), (x + h, y), font, 1, (0, 25, 255), 4
+                        )
+
+            # a late frame: its students are recorded, the preview moved on
+            if im is None:
+                continue
+            with metrics.time("display"):
+                cv2.imshow("Filling Attendance...", im)
+                # Frames are paced by the grabber thread now
+                key = cv2.waitKey(1) & 0xFF
+            if key == 27:
+                break
+    finally:
+        pipeline.stop()
+        print(pipeline.report())
+        cam.release()
+        metrics.count("students", len(ledger))
+        print(f"Metrics written to {metrics.write()}")
+    return ledger
+
+
 # for choose subject and fill attendance
 def subjectChoose(text_to_speech):
+    # the model stays loaded between sessions and is reloaded after training
+    models = get_model_manager(trainimagelabel_path, haarcasecade_path, studentdetail_path)
+
     def FillAttendance():
         sub = tx.get()
         now = time.time()
@@ -33,9 +125,8 @@ def subjectChoose(text_to_speech):
             text_to_speech(t)
         else:
             try:
-                recognizer = cv2.face.LBPHFaceRecognizer_create()
                 try:
-                    recognizer.read(trainimagelabel_path)
+                    recognizer = models.recognizer(sub if roster_scoped else None)
                 except:
                     e = "Model not found,please train model"
                     Notifica.configure(
@@ -47,92 +138,36 @@ def subjectChoose(text_to_speech):
                     )
                     Notifica.place(x=20, y=250)
                     text_to_speech(e)
-                facecasCade = cv2.CascadeClassifier(haarcasecade_path)
-                df = pd.read_csv(studentdetail_path)
-                cam = cv2.VideoCapture(0)
-                font = cv2.FONT_HERSHEY_SIMPLEX
-                col_names = ["Enrollment", "Name"]
-                attendance = pd.DataFrame(columns=col_names)
-                while True:
-                    ___, im = cam.read()
-                    gray = cv2.cvtColor(im, cv2.COLOR_BGR2GRAY)
-                    faces = facecasCade.detectMultiScale(gray, 1.2, 5)
-                    for (x, y, w, h) in faces:
-                        global Id
-
-                        Id, conf = recognizer.predict(gray[y : y + h, x : x + w])
-                        if conf < 70:
-                            print(conf)
-                            global Subject
-                            global aa
-                            global date
-                            global timeStamp
-                            Subject = tx.get()
-                            ts = time.time()
-                            date = datetime.datetime.fromtimestamp(ts).strftime(
-                                "%Y-%m-%d"
-                            )
-                            timeStamp = datetime.datetime.fromtimestamp(ts).strftime(
-                                "%H:%M:%S"
-                            )
-                            aa = df.loc[df["Enrollment"] == Id]["Name"].values
-                            global tt
-                            tt = str(Id) + "-" + aa
-                            # En='1604501160'+str(Id)
-                            attendance.loc[len(attendance)] = [
-                                Id,
-                                aa,
-                            ]
-                            cv2.rectangle(im, (x, y), (x + w, y + h), (0, 260, 0), 4)
-                            cv2.putText(
-                                im, str(tt), (x + h, y), font, 1, (255, 255, 0,), 4
-                            )
-                        else:
-                            Id = "Unknown"
-                            tt = str(Id)
-                            cv2.rectangle(im, (x, y), (x + w, y + h), (0, 25, 255), 7)
-                            cv2.putText(
-                                im, str(tt), (x + h, y), font, 1, (0, 25, 255), 4
-                            )
-                    if time.time() > future:
-                        break
-
-                    attendance = attendance.drop_duplicates(
-                        ["Enrollment"], keep="first"
+                    return
+                registry = models.registry()
+                if len(camera_sources) > 1:
+                    ledger, reports = multi_camera.run_session(
+                        camera_sources,
+                        haarcasecade_path,
+                        trainimagelabel_path,
+                        future - time.time(),
+                        registry=registry,
+                        detection_mode=detection_mode,
+                        face_size=expected_face_size,
+                        roster=load_roster(sub) if roster_scoped else None,
+                        target_fps=target_fps,
                     )
-                    cv2.imshow("Filling Attendance...", im)
-                    key = cv2.waitKey(30) & 0xFF
-                    if key == 27:
-                        break
+                    for report in reports:
+                        print(report)
+                else:
+                    ledger = fill_from_camera(
+                        camera_sources[0], recognizer, registry, future,
+                        detectors=models.detectors(default_workers()),
+                    )
+
+                if not ledger:
+                    raise ValueError("No student recognized")
 
-                ts = time.time()
-                print(aa)
-                # attendance["date"] = date
-                # attendance["Attendance"] = "P"
-                attendance[date] = 1
-                date = datetime.datetime.fromtimestamp(ts).strftime("%Y-%m-%d")
-                timeStamp = datetime.datetime.fromtimestamp(ts).strftime("%H:%M:%S")
-                Hour, Minute, Second = timeStamp.split(":")
-                # fileName = "Attendance/" + Subject + ".csv"
-                path = os.path.join(attendance_path, Subject)
-                if not os.path.exists(path):
-                    os.makedirs(path)
-                fileName = (
-                    f"{path}/"
-                    + Subject
-                    + "_"
-                    + date
-                    + "_"
-                    + Hour
-                    + "-"
-                    + Minute
-                    + "-"
-                    + Second
-                    + ".csv"
+                Subject = sub
+                fileName, attendance = save_session(
+                    ledger, Subject, attendance_path=attendance_path, write_csv=session_csv
                 )
-                attendance = attendance.drop_duplicates(["Enrollment"], keep="first")
                 print(attendance)
-                attendance.to_csv(fileName, index=False)
 
                 m = "Attendance Filled Successfully of " + Subject
                 Notifica.configure(
@@ -148,38 +183,34 @@ def subjectChoose(text_to_speech):
 
                 Notifica.place(x=20, y=250)
 
-                cam.release()
                 cv2.destroyAllWindows()
 
-                import csv
                 import tkinter
 
                 root = tkinter.Tk()
                 root.title("Attendance of " + Subject)
                 root.configure(background="black")
-                cs = os.path.join(path, fileName)
-                print(cs)
-                with open(cs, newline="") as file:
-                    reader = csv.reader(file)
-                    r = 0
+                if fileName:
+                    print(fileName)
+                r = 0
 
-                    for col in reader:
-                        c = 0
-                        for row in col:
+                for col in [list(attendance.columns)] + attendance.values.tolist():
+                    c = 0
+                    for row in col:
 
-                            label = tkinter.Label(
-                                root,
-                                width=10,
-                                height=1,
-                                fg="yellow",
-                                font=("times", 15, " bold "),
-                                bg="black",
-                                text=row,
-                                relief=tkinter.RIDGE,
-                            )
-                            label.grid(row=r, column=c)
-                            c += 1
-                        r += 1
+                        label = tkinter.Label(
+                            root,
+                            width=10,
+                            height=1,
+                            fg="yellow",
+                            font=("times", 15, " bold "),
+                            bg="black",
+                            text=row,
+                            relief=tkinter.RIDGE,
+                        )
+                        label.grid(row=r, column=c)
+                        c += 1
+                    r += 1
                 root.mainloop()
                 print(attendance)
             except:
@@ -225,6 +256,10 @@ def subjectChoose(text_to_speech):
             t = "Please enter the subject name!!!"
             text_to_speech(t)
         else:
+            # sessions live in the store, export the subject as a sheet to look at
+            get_store(os.path.join(attendance_path, "attendance.db")).export_csv(
+                sub, os.path.join(attendance_path, sub, "attendance.csv")
+            )
             os.startfile(
                 f"Attendance\\{sub}"
             )
@@ -0,0 +1,175 @@
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+
+from attendance_ledger import AttendanceLedger
+from attendance_store import save_session
+from automaticAttedance import (
+    attendance_path,
+    haarcasecade_path,
+    studentdetail_path,
+    trainimagelabel_path,
+)
+from face_detection import DETECTION_MODES, detect_faces
+from face_tracker import FaceTracker
+from lbph_matcher import ensure_binary_model, load_recognizer
+from recognition_pipeline import recognize_faces
+from student_registry import get_registry
+from subject_roster import load_roster
+
+
+def video_info(video_path):
+    """(frame count, fps) of a video file"""
+    cap = cv2.VideoCapture(video_path)
+    try:
+        if not cap.isOpened():
+            raise ValueError(f"Cannot open video {video_path}")
+        frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+        if frames <= 0:
+            raise ValueError(f"Cannot tell the length of video {video_path}")
+        return frames, fps
+    finally:
+        cap.release()
+
+
+def split_ranges(frames, parts):
+    """Split [0, frames) into at most parts contiguous (start, end) ranges"""
+    parts = max(1, min(parts, frames))
+    step = -(-frames // parts)
+    return [(start, min(start + step, frames)) for start in range(0, frames, step)]
+
+
+def process_range(video_path, start, end, recorded_at, fps, model_path, cascade_path,
+                  detection_mode="full", threshold=70, frame_step=1, roster=None):
+    """Recognize students in frames [start, end) of one video; runs in a worker process"""
+    recognizer = load_recognizer(model_path, roster)
+    detector = cv2.CascadeClassifier(cascade_path)
+    tracker = FaceTracker()
+    ledger = AttendanceLedger()
+    detection = DETECTION_MODES[detection_mode]
+
+    cap = cv2.VideoCapture(video_path)
+    cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+    predictions = 0
+    try:
+        for index in range(start, end):
+            # grab() skips decoding frames that are not analysed
+            if (index - start) % frame_step:
+                if not cap.grab():
+                    break
+                continue
+            ret, im = cap.read()
+            if not ret:
+                break
+            gray = cv2.cvtColor(im, cv2.COLOR_BGR2GRAY)
+            faces = detect_faces(gray, detector, detection)
+            found, predicted = recognize_faces(recognizer, gray, faces, index, tracker)
+            predictions += predicted
+            for (x, y, w, h, Id, conf) in found:
+                if conf < threshold:
+                    ledger.record(Id, "", conf, recorded_at + index / fps)
+    finally:
+        cap.release()
+    return ledger, end - start, predictions
+
+
+def run_batch(videos, subject, workers=None, detection_mode="full", threshold=70,
+              frame_step=1, model_path=trainimagelabel_path, cascade_path=haarcasecade_path,
+              details_path=studentdetail_path, output_path=attendance_path, write_csv=False,
+              roster_scoped=True):
+    """Headless attendance for recorded lectures, written like a live session.
+
+    Every video is split into frame ranges that are processed in parallel by a
+    process pool, as fast as the CPU allows. The ranges are merged in order into
+    one ledger, so each student is counted once across all videos, and the
+    session is saved to the attendance store with the recording's timestamp
+    (and as a sheet under Attendance/<subject>/ with write_csv). With
+    roster_scoped, faces are only matched against the subject's roster.
+    """
+    workers = workers or os.cpu_count() or 1
+    roster = load_roster(subject) if roster_scoped else None
+    jobs = []
+    recording_start = None
+    for video_path in videos:
+        frames, fps = video_info(video_path)
+        # the file is last written when the recording stops
+        recorded_at = os.path.getmtime(video_path) - frames / fps
+        recording_start = min(recording_start or recorded_at, recorded_at)
+        parts = max(1, workers // len(videos))
+        for start, end in split_ranges(frames, parts):
+            jobs.append((video_path, start, end, recorded_at, fps))
+
+    ensure_binary_model(model_path)
+    started = time.time()
+    ledger = AttendanceLedger()
+    total_frames = 0
+    total_predictions = 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(
+                process_range, video_path, start, end, recorded_at, fps, model_path,
+                cascade_path, detection_mode, threshold, frame_step, roster,
+            )
+            for video_path, start, end, recorded_at, fps in jobs
+        ]
+        for future in futures:
+            range_ledger, frames, predictions = future.result()
+            ledger.merge(range_ledger)
+            total_frames += frames
+            total_predictions += predictions
+
+    registry = get_registry(details_path)
+    for entry in ledger:
+        entry.name = registry.name(entry.enrollment)
+
+    elapsed = time.time() - started
+    print(
+        f"Processed {total_frames} frames from {len(videos)} video(s) in {elapsed:.1f}s "
+        f"({total_frames / elapsed if elapsed else 0:.1f} frames/s, {total_predictions} predictions)"
+    )
+    if not ledger:
+        print("No student recognized")
+        return None, ledger
+
+    fileName, attendance = save_session(
+        ledger, subject, recording_start, attendance_path=output_path, write_csv=write_csv
+    )
+    print(attendance)
+    print(f"Saved {fileName or 'session'} for {subject}")
+    return fileName, ledger
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fill attendance from recorded lecture videos")
+    parser.add_argument("videos", nargs="+", help="video files of one lecture")
+    parser.add_argument("--subject", required=True)
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: all cores)")
+    parser.add_argument("--mode", choices=sorted(DETECTION_MODES), default="full",
+                        help="detection mode, see face_detection.py")
+    parser.add_argument("--threshold", type=float, default=70)
+    parser.add_argument("--frame-step", type=int, default=1, help="analyse every Nth frame")
+    parser.add_argument("--model", default=trainimagelabel_path)
+    parser.add_argument("--csv", action="store_true", help="also write a session sheet")
+    parser.add_argument("--all-students", action="store_true",
+                        help="match against every student, not just the subject's roster")
+    args = parser.parse_args()
+
+    run_batch(
+        args.videos,
+        args.subject,
+        workers=args.workers,
+        detection_mode=args.mode,
+        threshold=args.threshold,
+        frame_step=args.frame_step,
+        model_path=args.model,
+        write_csv=args.csv,
+        roster_scoped=not args.all_students,
+    )
+
+
+if __name__ == "__main__":
+    main()
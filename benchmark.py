@@ -0,0 +1,333 @@
+import argparse
+import datetime
+import json
+import os
+import platform
+import shutil
+import statistics
+import tempfile
+import time
+
+import cv2
+import numpy as np
+import pandas as pd
+
+import lbph_matcher
+import show_attendance
+import trainImage
+from face_detection import DETECTION_MODES, detect_faces, detect_faces_roi
+from face_tracker import FaceTracker
+from recognition_pipeline import recognize_faces
+from student_registry import StudentRegistry
+
+# next to this file, so the benchmark runs from any directory
+haarcasecade_path = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "haarcascade_frontalface_default.xml"
+)
+
+
+def summarize(samples):
+    """Timing summary in milliseconds"""
+    ms = sorted(1000.0 * s for s in samples)
+    return {
+        "n": len(ms),
+        "mean_ms": round(statistics.fmean(ms), 3),
+        "p50_ms": round(ms[len(ms) // 2], 3),
+        "p95_ms": round(ms[min(len(ms) - 1, int(len(ms) * 0.95))], 3),
+        "max_ms": round(ms[-1], 3),
+    }
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def synthetic_face(identity, rng, size=200):
+    """A drawn face: per-student geometry from identity, per-image jitter from rng"""
+    face = np.full((size, size), int(identity["background"]), dtype=np.uint8)
+    cx = size // 2 + int(rng.integers(-4, 5))
+    cy = size // 2 + int(rng.integers(-4, 5))
+    axes = (int(identity["width"]), int(identity["height"]))
+    cv2.ellipse(face, (cx, cy), axes, 0, 0, 360, int(identity["skin"]), -1)
+    eye_dx, eye_y = int(identity["eye_dx"]), cy - int(identity["eye_dy"])
+    for dx in (-eye_dx, eye_dx):
+        cv2.ellipse(face, (cx + dx, eye_y), (14, 7), 0, 0, 360, 40, -1)
+        cv2.circle(face, (cx + dx, eye_y), 4, 10, -1)
+    cv2.line(face, (cx, cy - 10), (cx - 6, cy + 18), int(identity["skin"]) - 40, 3)
+    mouth_y = cy + int(identity["mouth_dy"])
+    cv2.ellipse(face, (cx, mouth_y), (int(identity["mouth_w"]), 8), 0, 0, 180, 60, 3)
+    noise = rng.normal(0, 6, face.shape)
+    return np.clip(face + noise, 0, 255).astype(np.uint8)
+
+
+def student_identity(rng):
+    return {
+        "background": rng.integers(20, 90),
+        "skin": rng.integers(140, 220),
+        "width": rng.integers(58, 72),
+        "height": rng.integers(76, 90),
+        "eye_dx": rng.integers(22, 32),
+        "eye_dy": rng.integers(18, 28),
+        "mouth_dy": rng.integers(30, 42),
+        "mouth_w": rng.integers(16, 28),
+    }
+
+
+def make_training_tree(root, students, images, seed=0):
+    """TrainingImage/<enrollment>_<name>/ folders of synthetic faces and their details csv"""
+    rng = np.random.default_rng(seed)
+    trainimage_path = os.path.join(root, "TrainingImage")
+    details_path = os.path.join(root, "StudentDetails", "studentdetails.csv")
+    os.makedirs(trainimage_path, exist_ok=True)
+    os.makedirs(os.path.dirname(details_path), exist_ok=True)
+
+    identities = {}
+    rows = [("Enrollment", "Name")]
+    for i in range(students):
+        enrollment = 1000 + i
+        name = f"Student{i}"
+        identity = student_identity(rng)
+        identities[enrollment] = identity
+        rows.append((enrollment, name))
+        student_path = os.path.join(trainimage_path, f"{enrollment}_{name}")
+        os.makedirs(student_path, exist_ok=True)
+        for n in range(images):
+            # stored images are a bit larger than the face, like TakeImage crops
+            image = cv2.copyMakeBorder(synthetic_face(identity, rng), 30, 30, 30, 30,
+                                       cv2.BORDER_CONSTANT, value=int(identity["background"]))
+            cv2.imwrite(os.path.join(student_path, f"{name}_{enrollment}_{n + 1}.jpg"), image)
+
+    pd.DataFrame(rows[1:], columns=rows[0]).to_csv(details_path, index=False)
+    return trainimage_path, details_path, identities
+
+
+def make_attendance_tree(root, subject, students, sessions, seed=0):
+    """Attendance/<subject>/ sheets in the format FillAttendance writes"""
+    rng = np.random.default_rng(seed + 1)
+    attendance_path = os.path.join(root, "Attendance")
+    path = os.path.join(attendance_path, subject)
+    os.makedirs(path, exist_ok=True)
+    start = datetime.datetime(2026, 1, 5, 9, 0, 0)
+    enrollments = np.arange(1000, 1000 + students)
+    for n in range(sessions):
+        ts = start + datetime.timedelta(days=n)
+        date = ts.strftime("%Y-%m-%d")
+        present = enrollments[rng.random(students) < 0.8]
+        df = pd.DataFrame({"Enrollment": present, "Name": [f"['Student{e - 1000}']" for e in present]})
+        df[date] = 1
+        df.to_csv(os.path.join(path, f"{subject}_{date}_{ts.strftime('%H-%M-%S')}.csv"), index=False)
+    return attendance_path
+
+
+def make_frame(identities, rng, faces=8, width=640, height=480):
+    """A classroom-like frame with synthetic faces on a grid"""
+    frame = np.full((height, width), 70, dtype=np.uint8)
+    cols = max(1, width // 160)
+    enrollments = list(identities)
+    for i in range(faces):
+        identity = identities[enrollments[int(rng.integers(len(enrollments)))]]
+        face = cv2.resize(synthetic_face(identity, rng), (120, 120))
+        x = 20 + (i % cols) * 155
+        y = 20 + (i // cols) * 150
+        if y + 120 > height:
+            break
+        frame[y:y + 120, x:x + 120] = face
+    return cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR)
+
+
+def bench_training(root, trainimage_path, details_path, workers):
+    model_path = os.path.join(root, "TrainingImageLabel", "Trainner.yml")
+    quiet = lambda text: None
+    # the synthetic students, and metrics kept out of the real Metrics folder
+    paths = {"details_path": details_path, "metrics_path": os.path.join(root, "Metrics")}
+    results = {}
+    # cold run: every image decoded and detected
+    elapsed, _ = timed(trainImage.TrainImage, haarcasecade_path, trainimage_path, model_path,
+                       None, quiet, full_rebuild=True, workers=workers, **paths)
+    results["train_full_cold_s"] = round(elapsed, 3)
+    # warm run: preprocessed faces come from the cache
+    elapsed, _ = timed(trainImage.TrainImage, haarcasecade_path, trainimage_path, model_path,
+                       None, quiet, full_rebuild=True, workers=workers, **paths)
+    results["train_full_cached_s"] = round(elapsed, 3)
+    # nothing new: incremental run is just a scan
+    elapsed, _ = timed(trainImage.TrainImage, haarcasecade_path, trainimage_path, model_path,
+                       None, quiet, workers=workers, **paths)
+    results["train_incremental_noop_s"] = round(elapsed, 3)
+
+    detector = cv2.CascadeClassifier(haarcasecade_path)
+    faces, ids = trainImage.collect_faces(
+        [(sid, path, trainImage.list_student_images(path))
+         for sid, _, path in trainImage.list_student_dirs(trainimage_path)],
+        haarcasecade_path, detector,
+    )
+    results["detected_faces"] = len(faces)
+    return results, model_path
+
+
+def bench_model_formats(root, recognizer, samples):
+    """Load time and size of Trainner.yml against the binary model, and their agreement"""
+    model_path = os.path.join(root, "TrainingImageLabel", "Bench.yml")
+    os.makedirs(os.path.dirname(model_path), exist_ok=True)
+    bin_path = lbph_matcher.model_bin_path(model_path)
+    recognizer.save(model_path)
+    lbph_matcher.export_model(recognizer, bin_path)
+
+    def read_yaml():
+        loaded = cv2.face.LBPHFaceRecognizer_create()
+        loaded.read(model_path)
+        return loaded
+
+    yaml_s, loaded = timed(read_yaml)
+    bin_s, matcher = timed(lbph_matcher.LBPHMatcher.load, bin_path)
+    agree = sum(loaded.predict(c)[0] == matcher.predict(c)[0] for c in samples)
+    # one frame's faces: a predict call each, against one batched call
+    per_frame = {}
+    for faces in (1, 8, 32):
+        crops = [samples[i % len(samples)] for i in range(faces)]
+        loop_s, _ = timed(lambda: [loaded.predict(c) for c in crops])
+        batch_s, _ = timed(matcher.predict_batch, crops)
+        per_frame[faces] = {"loop_ms": round(1000 * loop_s, 2), "batch_ms": round(1000 * batch_s, 2)}
+    return {
+        "yaml_load_s": round(yaml_s, 4),
+        "yaml_mb": round(os.path.getsize(model_path) / 2 ** 20, 2),
+        "bin_load_s": round(bin_s, 4),
+        "bin_mb": round(os.path.getsize(bin_path) / 2 ** 20, 2),
+        "predict_per_face_numpy": summarize([timed(matcher.predict, c)[0] for c in samples]),
+        "same_prediction": f"{agree}/{len(samples)}",
+        "frame_predict": per_frame,
+    }
+
+
+def bench_recognition(root, identities, images, frames, faces_per_frame, seed=0):
+    """Per-frame cost of the recognition loop on a model trained from synthetic crops.
+
+    The model is trained on the crops directly, so the timing does not depend
+    on how many synthetic faces the Haar cascade happens to accept.
+    """
+    rng = np.random.default_rng(seed + 2)
+    crops, ids = [], []
+    for enrollment, identity in identities.items():
+        for _ in range(images):
+            crops.append(synthetic_face(identity, rng))
+            ids.append(enrollment)
+    recognizer = trainImage.create_recognizer()
+    elapsed, _ = timed(recognizer.train, crops, np.array(ids))
+    results = {"lbph_train_s": round(elapsed, 3), "templates": len(crops)}
+
+    samples = [crops[int(rng.integers(len(crops)))] for _ in range(min(50, frames))]
+    results["predict_per_face"] = summarize([timed(recognizer.predict, c)[0] for c in samples])
+    results["model_formats"] = bench_model_formats(root, recognizer, samples)
+
+    # the recognizer FillAttendance predicts with: cv2 or the matcher, as measured
+    live = lbph_matcher.live_recognizer(
+        lbph_matcher.LBPHMatcher.from_recognizer(recognizer), None, recognizer
+    )
+    results["live_recognizer"] = type(live).__name__
+
+    detector = cv2.CascadeClassifier(haarcasecade_path)
+    test_frames = [make_frame(identities, rng, faces_per_frame) for _ in range(frames)]
+    for mode in sorted(DETECTION_MODES):
+        for tracking in (False, True):
+            tracker = FaceTracker() if tracking else None
+            per_frame = []
+            for seq, im in enumerate(test_frames):
+                start = time.perf_counter()
+                gray = cv2.cvtColor(im, cv2.COLOR_BGR2GRAY)
+                boxes = detect_faces(gray, detector, DETECTION_MODES[mode])
+                recognize_faces(live, gray, boxes, seq, tracker)
+                per_frame.append(time.perf_counter() - start)
+            key = f"frame_{mode}_{'tracked' if tracking else 'untracked'}"
+            results[key] = summarize(per_frame)
+        # the search the frame scheduler runs between full passes under load
+        per_frame = []
+        for im in test_frames:
+            gray = cv2.cvtColor(im, cv2.COLOR_BGR2GRAY)
+            boxes = detect_faces(gray, detector, DETECTION_MODES[mode])
+            per_frame.append(timed(detect_faces_roi, gray, detector, boxes, DETECTION_MODES[mode])[0])
+        results[f"detect_{mode}_roi"] = summarize(per_frame)
+    return results
+
+
+def bench_reporting(attendance_path, details_path, subject, repeats):
+    registry = StudentRegistry(details_path)
+    # the first view imports every sheet into the attendance store
+    first, merged = timed(show_attendance.merge_attendance, subject, attendance_path, registry)
+    samples = []
+    for _ in range(repeats):
+        elapsed, merged = timed(show_attendance.merge_attendance, subject, attendance_path, registry)
+        samples.append(elapsed)
+    return {
+        "merge_attendance_first_s": round(first, 3),
+        "merge_attendance": summarize(samples),
+        "merged_rows": len(merged),
+    }
+
+
+def run(args):
+    root = args.workdir or tempfile.mkdtemp(prefix="ams_bench_")
+    os.makedirs(root, exist_ok=True)
+    results = {
+        "started": datetime.datetime.now().isoformat(timespec="seconds"),
+        "params": vars(args),
+        "environment": {
+            "python": platform.python_version(),
+            "opencv": cv2.__version__,
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "cpus": os.cpu_count(),
+            "platform": platform.platform(),
+        },
+    }
+    try:
+        elapsed, (trainimage_path, details_path, identities) = timed(
+            make_training_tree, root, args.students, args.images, args.seed
+        )
+        results["generate_training_s"] = round(elapsed, 3)
+        attendance_path = make_attendance_tree(root, args.subject, args.students, args.sessions, args.seed)
+
+        if "train" in args.only:
+            results["training"], _ = bench_training(root, trainimage_path, details_path, args.workers)
+        if "recognize" in args.only:
+            results["recognition"] = bench_recognition(
+                root, identities, min(args.images, 5), args.frames, args.faces, args.seed
+            )
+        if "report" in args.only:
+            results["reporting"] = bench_reporting(
+                attendance_path, details_path, args.subject, args.repeats
+            )
+    finally:
+        if not args.keep and not args.workdir:
+            shutil.rmtree(root, ignore_errors=True)
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2, default=str)
+    print(json.dumps(results, indent=2, default=str))
+    print(f"Results written to {args.output}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark training, recognition and reporting on a synthetic dataset"
+    )
+    parser.add_argument("--students", type=int, default=100, help="up to ~10000")
+    parser.add_argument("--images", type=int, default=10, help="training images per student")
+    parser.add_argument("--sessions", type=int, default=60, help="attendance sheets to merge")
+    parser.add_argument("--subject", default="Bench")
+    parser.add_argument("--frames", type=int, default=50, help="frames for the recognition loop")
+    parser.add_argument("--faces", type=int, default=8, help="faces per frame")
+    parser.add_argument("--repeats", type=int, default=5, help="repeats of the merge timing")
+    parser.add_argument("--workers", type=int, default=1, help="training processes")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--only", nargs="+", default=["train", "recognize", "report"],
+                        choices=["train", "recognize", "report"])
+    parser.add_argument("--workdir", default=None, help="keep the dataset in this folder")
+    parser.add_argument("--keep", action="store_true", help="keep the temporary dataset")
+    parser.add_argument("--output", default="benchmark_results.json")
+    run(parser.parse_args())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+import datetime
+import hashlib
+import json
+import os
+
+import numpy as np
+
+
+# one archive per student folder, replacing its loose JPEG files
+ARCHIVE_NAME = "faces.npy"
+META_NAME = "faces.json"
+
+
+def archive_path(student_path):
+    return os.path.join(student_path, ARCHIVE_NAME)
+
+
+def has_archive(student_path):
+    return os.path.exists(archive_path(student_path))
+
+
+def sample_key(index):
+    """Name of one archived sample in the training state, like an image file name"""
+    return f"{ARCHIVE_NAME}:{index}"
+
+
+def sample_index(key):
+    return int(key.rsplit(":", 1)[1])
+
+
+def read_meta(student_path):
+    try:
+        with open(os.path.join(student_path, META_NAME)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"samples": []}
+
+
+def read_archive(student_path, mmap=True):
+    """(faces, meta): faces is an (n, height, width) uint8 array, memory-mapped by default"""
+    faces = np.load(archive_path(student_path), mmap_mode="r" if mmap else None)
+    return faces, read_meta(student_path)
+
+
+def archive_state(student_path):
+    """{sample key: sample id} of an archive, for incremental training"""
+    meta = read_meta(student_path)
+    return {sample_key(i): sample["id"] for i, sample in enumerate(meta["samples"])}
+
+
+class FaceArchiveWriter:
+    """Collects preprocessed face crops of one student and writes them as one archive.
+
+    The crops go to <student folder>/faces.npy as a single (n, height, width)
+    uint8 array that training memory-maps, with faces.json holding the
+    enrollment, name and where and when each sample came from. Existing
+    samples are kept and new ones appended, or dropped with replace.
+    """
+
+    def __init__(self, student_path, enrollment, name, face_size, replace=False):
+        self.student_path = student_path
+        self.enrollment = enrollment
+        self.name = name
+        self.face_size = tuple(face_size)
+        self.replace = replace
+        self.faces = []
+        self.samples = []
+
+    def add(self, face, source="capture"):
+        face = np.ascontiguousarray(face, dtype=np.uint8)
+        if face.shape != (self.face_size[1], self.face_size[0]):
+            raise ValueError(f"Face crop {face.shape} does not match archive size {self.face_size}")
+        self.faces.append(face)
+        self.samples.append({
+            "id": hashlib.sha1(face.tobytes()).hexdigest()[:16],
+            "source": source,
+            "added": datetime.datetime.now().isoformat(timespec="seconds"),
+        })
+
+    def __len__(self):
+        return len(self.faces)
+
+    def close(self):
+        if not self.faces:
+            return 0
+        os.makedirs(self.student_path, exist_ok=True)
+        faces = np.stack(self.faces)
+        samples = list(self.samples)
+        if has_archive(self.student_path) and not self.replace:
+            old_faces, meta = read_archive(self.student_path, mmap=False)
+            if old_faces.shape[1:] == faces.shape[1:]:
+                faces = np.concatenate([old_faces, faces])
+                samples = meta["samples"] + samples
+
+        tmp_path = archive_path(self.student_path) + ".tmp"
+        with open(tmp_path, "wb") as f:
+            np.save(f, faces)
+        os.replace(tmp_path, archive_path(self.student_path))
+
+        meta_path = os.path.join(self.student_path, META_NAME)
+        with open(meta_path + ".tmp", "w") as f:
+            json.dump({
+                "enrollment": str(self.enrollment),
+                "name": self.name,
+                "face_size": list(self.face_size),
+                "samples": samples,
+            }, f, indent=1)
+        os.replace(meta_path + ".tmp", meta_path)
+        self.faces, self.samples = [], []
+        return len(samples)
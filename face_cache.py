@@ -0,0 +1,70 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+
+
+class FaceCache:
+    """On-disk cache of preprocessed training crops, one .npz file per student.
+
+    Each entry is keyed by the image file name and its (size, mtime) fingerprint,
+    and the whole cache is tied to a hash of the preprocessing parameters, so a
+    change to the detector settings or crop size invalidates it. Images in which
+    no face was found are cached too, so they are not run through the detector
+    again on the next training run.
+    """
+
+    def __init__(self, cache_dir, params):
+        self.cache_dir = cache_dir
+        self.key = hashlib.sha1(json.dumps(params, sort_keys=True).encode()).hexdigest()
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, student_dir):
+        return os.path.join(self.cache_dir, student_dir + ".npz")
+
+    def load(self, student_dir):
+        """{image_file: (fingerprint, face or None)} for one student"""
+        try:
+            with np.load(self._path(student_dir)) as data:
+                if str(data["key"]) != self.key:
+                    return {}
+                entries = {}
+                for image_file, size, mtime, found, face in zip(
+                    data["files"], data["sizes"], data["mtimes"], data["found"], data["faces"]
+                ):
+                    fingerprint = [int(size), int(mtime)]
+                    entries[str(image_file)] = (fingerprint, face if found else None)
+                return entries
+        except (OSError, KeyError, ValueError):
+            return {}
+
+    def save(self, student_dir, entries, face_shape):
+        """Write the entries of one student, replacing the previous file atomically"""
+        files = sorted(entries)
+        faces = np.zeros((len(files),) + tuple(face_shape), dtype=np.uint8)
+        found = np.zeros(len(files), dtype=bool)
+        sizes = np.zeros(len(files), dtype=np.int64)
+        mtimes = np.zeros(len(files), dtype=np.int64)
+        for i, image_file in enumerate(files):
+            fingerprint, face = entries[image_file]
+            sizes[i], mtimes[i] = fingerprint
+            if face is not None:
+                faces[i] = face
+                found[i] = True
+
+        path = self._path(student_dir)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                key=np.array(self.key),
+                files=np.array(files, dtype=str),
+                sizes=sizes,
+                mtimes=mtimes,
+                found=found,
+                faces=faces,
+            )
+        os.replace(tmp_path, path)
@@ -0,0 +1,94 @@
+import itertools
+import threading
+
+
+def box_iou(a, b):
+    """Intersection over union of two (x, y, w, h) boxes"""
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    iw = min(ax + aw, bx + bw) - max(ax, bx)
+    ih = min(ay + ah, by + bh) - max(ay, by)
+    if iw <= 0 or ih <= 0:
+        return 0.0
+    inter = iw * ih
+    return inter / float(aw * ah + bw * bh - inter)
+
+
+class Track:
+    """One face followed across frames, with its last LBPH prediction"""
+
+    def __init__(self, track_id, box, seq):
+        self.track_id = track_id
+        self.box = box
+        self.last_seen = seq
+        self.predicted_at = None
+        self.Id = None
+        self.conf = None
+
+
+class FaceTracker:
+    """Links detections across frames by box overlap.
+
+    update() returns every detection paired with its track and a flag telling
+    the caller whether the face must go through recognizer.predict: only new
+    tracks and tracks whose last prediction is recheck_every frames old need it,
+    the rest reuse the track's label. Safe to share between pipeline workers,
+    which may hand in frames slightly out of order.
+    """
+
+    def __init__(self, iou_threshold=0.3, recheck_every=15, max_missed=10):
+        self.iou_threshold = iou_threshold
+        self.recheck_every = recheck_every
+        self.max_missed = max_missed
+        self.tracks = []
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def update(self, seq, boxes):
+        """[(box, track, needs_predict), ...] for the detections of frame seq"""
+        boxes = [tuple(int(v) for v in box) for box in boxes]
+        with self._lock:
+            # Greedy matching, best overlap first
+            pairs = []
+            for i, box in enumerate(boxes):
+                for track in self.tracks:
+                    iou = box_iou(box, track.box)
+                    if iou >= self.iou_threshold:
+                        pairs.append((iou, i, track))
+            pairs.sort(key=lambda p: p[0], reverse=True)
+
+            matched = {}
+            used = set()
+            for iou, i, track in pairs:
+                if i in matched or track.track_id in used:
+                    continue
+                matched[i] = track
+                used.add(track.track_id)
+
+            result = []
+            for i, box in enumerate(boxes):
+                track = matched.get(i)
+                if track is None:
+                    track = Track(next(self._ids), box, seq)
+                    self.tracks.append(track)
+                elif seq >= track.last_seen:
+                    track.box = box
+                    track.last_seen = seq
+
+                needs_predict = track.Id is None or (
+                    seq - track.predicted_at >= self.recheck_every
+                )
+                if needs_predict:
+                    track.predicted_at = seq
+                result.append((box, track, needs_predict))
+
+            # Forget faces that left the frame
+            self.tracks = [
+                t for t in self.tracks if seq - t.last_seen <= self.max_missed
+            ]
+            return result
+
+    def assign(self, track, Id, conf):
+        with self._lock:
+            track.Id = Id
+            track.conf = conf
@@ -0,0 +1,121 @@
+import threading
+import time
+
+
+class FrameScheduler:
+    """Trades detection quality for frame rate when the recognition loop falls behind.
+
+    Every worker reports what each frame cost (convert, detect, predict) and
+    the consumer reports how old each frame is when it is shown. The budget
+    per frame is workers / target_fps. When the measured cost or the latency
+    goes over it, the full-frame cascade runs only every interval frames, with
+    the frames in between searched only around the faces already found (ROI
+    detection); the interval doubles up to max_interval. Frames that waited
+    longer than max_latency in the queue are dropped. When the cost estimated
+    for the next better interval fits in headroom of the budget, the interval
+    halves again, back to a full pass on every frame.
+    """
+
+    def __init__(self, target_fps=15.0, workers=1, max_interval=8, max_latency=None,
+                 headroom=0.7, settle=10, smoothing=0.2):
+        self.target_fps = target_fps
+        self.budget = workers / float(target_fps)
+        self.max_interval = max_interval
+        self.max_latency = max_latency or max(2.0 * self.budget, 0.25)
+        self.headroom = headroom
+        # frames to wait after a change before judging the new interval
+        self.settle = settle
+        self.smoothing = smoothing
+        self.interval = 1
+        self.full_cost = None
+        self.roi_cost = None
+        self.latency = None
+        self.degraded = 0
+        self.restored = 0
+        self._boxes = []
+        self._last_full = None
+        self._since_change = 0
+        self._lock = threading.Lock()
+
+    def is_stale(self, grabbed_at):
+        return time.perf_counter() - grabbed_at > self.max_latency
+
+    def plan(self, seq):
+        """(full, boxes): run the full cascade, or ROI detection around boxes"""
+        with self._lock:
+            if (
+                self.interval == 1
+                or not self._boxes
+                or self._last_full is None
+                or seq - self._last_full >= self.interval
+            ):
+                if self._last_full is None or seq > self._last_full:
+                    self._last_full = seq
+                return True, None
+            return False, list(self._boxes)
+
+    def observe(self, full, boxes, cost):
+        """Record one processed frame; returns +1 after degrading, -1 after restoring, else 0"""
+        with self._lock:
+            if full:
+                self.full_cost = self._smooth(self.full_cost, cost)
+            else:
+                self.roi_cost = self._smooth(self.roi_cost, cost)
+            self._boxes = list(boxes)
+            return self._adjust()
+
+    def observe_latency(self, latency):
+        with self._lock:
+            self.latency = self._smooth(self.latency, latency)
+
+    def _smooth(self, average, value):
+        if average is None:
+            return value
+        return average + self.smoothing * (value - average)
+
+    def frame_cost(self, interval):
+        """Expected cost of a frame when the full cascade runs every interval frames"""
+        full = self.full_cost or 0.0
+        # until an ROI frame has been measured assume it costs as much as a full one
+        roi = self.roi_cost if self.roi_cost is not None else full
+        return (full + (interval - 1) * roi) / interval
+
+    def _adjust(self):
+        self._since_change += 1
+        if self._since_change < self.settle or self.full_cost is None:
+            return 0
+        latency = self.latency or 0.0
+        if self.interval < self.max_interval and (
+            self.frame_cost(self.interval) > self.budget or latency > self.max_latency
+        ):
+            self.interval *= 2
+            self.degraded += 1
+            self._since_change = 0
+            return 1
+        if (
+            self.interval > 1
+            and latency <= self.headroom * self.max_latency
+            and self.frame_cost(self.interval // 2) <= self.headroom * self.budget
+        ):
+            self.interval //= 2
+            self.restored += 1
+            self._since_change = 0
+            return -1
+        return 0
+
+    @property
+    def quality(self):
+        if self.interval == 1:
+            return "full detection on every frame"
+        return f"full detection every {self.interval} frames, ROI detection between"
+
+    def report(self):
+        def ms(seconds):
+            return "-" if seconds is None else f"{seconds * 1000:.1f} ms"
+
+        return (
+            f"Scheduler: target {self.target_fps:g} fps ({ms(self.budget)} per frame and worker), "
+            f"full frame {ms(self.full_cost)}, ROI frame {ms(self.roi_cost)}, "
+            f"latency {ms(self.latency)}; degraded {self.degraded}x, restored {self.restored}x, "
+            f"ended with {self.quality}"
+        )
@@ -0,0 +1,148 @@
+import threading
+from collections import deque
+
+import cv2
+import numpy as np
+
+
+class WebcamSource:
+    """cv2.VideoCapture for a local camera, video file or RTSP URL"""
+
+    def __init__(self, source=0, api=None, width=None, height=None):
+        if api is None:
+            self.cam = cv2.VideoCapture(source)
+        else:
+            self.cam = cv2.VideoCapture(source, api)
+        if width:
+            self.cam.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+        if height:
+            self.cam.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+
+    def read(self):
+        return self.cam.read()
+
+    def isOpened(self):
+        return self.cam.isOpened()
+
+    def release(self):
+        self.cam.release()
+
+
+class NetworkCameraSource:
+    """Frames from an HTTP camera such as the IP Webcam phone app.
+
+    A background thread keeps one pooled keep-alive connection open, reads
+    either an MJPEG stream (multipart/x-mixed-replace, e.g. /video) or polls
+    single JPEG snapshots (e.g. /shot.jpg), decodes the JPEGs and keeps the
+    newest frames in a small ring buffer. read() has the same contract as
+    cv2.VideoCapture.read() and always returns the latest frame, so a slow
+    consumer never falls behind the camera.
+    """
+
+    def __init__(self, url, buffer_size=2, timeout=5.0, session=None, chunk_size=16384):
+        # only network cameras need requests
+        import requests
+
+        self.url = url
+        self.timeout = timeout
+        self.chunk_size = chunk_size
+        self.session = session or requests.Session()
+        self.frames = deque(maxlen=buffer_size)
+        self.decoded = 0
+        self.dropped = 0
+        self.errors = 0
+        self._seq = 0
+        self._read_seq = 0
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="network-camera", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        import requests
+
+        backoff = 0.5
+        while not self._stop.is_set():
+            try:
+                with self.session.get(self.url, stream=True, timeout=self.timeout) as response:
+                    response.raise_for_status()
+                    content_type = response.headers.get("Content-Type", "")
+                    if content_type.startswith("multipart/"):
+                        self._read_mjpeg(response)
+                    else:
+                        self._push(response.content)
+                backoff = 0.5
+            except requests.RequestException as e:
+                self.errors += 1
+                print(f"Network camera error: {e}")
+                # Reconnect with backoff instead of hammering the camera
+                self._stop.wait(backoff)
+                backoff = min(backoff * 2, 5.0)
+
+    def _read_mjpeg(self, response):
+        buf = bytearray()
+        for chunk in response.iter_content(chunk_size=self.chunk_size):
+            if self._stop.is_set():
+                return
+            buf += chunk
+            while True:
+                start = buf.find(b"\xff\xd8")
+                if start < 0:
+                    # keep a byte in case the marker is split across chunks
+                    del buf[:-1]
+                    break
+                end = buf.find(b"\xff\xd9", start + 2)
+                if end < 0:
+                    del buf[:start]
+                    break
+                jpg = bytes(buf[start:end + 2])
+                del buf[:end + 2]
+                self._push(jpg)
+
+    def _push(self, jpg):
+        frame = cv2.imdecode(np.frombuffer(jpg, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if frame is None:
+            self.errors += 1
+            return
+        with self._cond:
+            if len(self.frames) == self.frames.maxlen:
+                self.dropped += 1
+            self.frames.append(frame)
+            self._seq += 1
+            self.decoded += 1
+            self._cond.notify_all()
+
+    def read(self):
+        """(True, newest frame) once a frame newer than the last read arrives"""
+        with self._cond:
+            self._cond.wait_for(
+                lambda: self._seq != self._read_seq or self._stop.is_set(),
+                timeout=self.timeout,
+            )
+            if self._seq == self._read_seq or not self.frames:
+                return False, None
+            self._read_seq = self._seq
+            frame = self.frames[-1]
+            # older buffered frames are never shown
+            self.dropped += len(self.frames) - 1
+            self.frames.clear()
+            return True, frame
+
+    def isOpened(self):
+        return self._thread.is_alive() and not self._stop.is_set()
+
+    def release(self):
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        self._thread.join(timeout=self.timeout)
+        self.session.close()
+
+
+def open_source(source, **kwargs):
+    """Frame source for a camera index, video file, RTSP URL or HTTP camera URL"""
+    if isinstance(source, str) and source.startswith(("http://", "https://")):
+        return NetworkCameraSource(source)
+    if isinstance(source, str) and source.isdigit():
+        source = int(source)
+    return WebcamSource(source, **kwargs)
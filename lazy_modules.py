@@ -0,0 +1,49 @@
+import importlib
+import sys
+import threading
+import time
+
+
+class LazyModules:
+    """Imports feature modules on first use instead of at startup.
+
+    get() imports a module the first time it is asked for and records how
+    long that took. warm() imports a list of modules on a background thread
+    after the window is up, so a button is usually ready by the time it is
+    clicked. Python's import lock makes a get() that races the warm-up wait
+    for it instead of importing twice.
+    """
+
+    def __init__(self):
+        self.import_times = {}
+        self._lock = threading.Lock()
+
+    def get(self, name):
+        module = sys.modules.get(name)
+        if module is not None and name in self.import_times:
+            return module
+        start = time.perf_counter()
+        module = importlib.import_module(name)
+        with self._lock:
+            self.import_times.setdefault(name, time.perf_counter() - start)
+        return module
+
+    def warm(self, names, done=None):
+        def run():
+            for name in names:
+                try:
+                    self.get(name)
+                except Exception as e:
+                    # surfaced again when the feature is used
+                    print(f"Warm-up import of {name} failed: {e}")
+            if done is not None:
+                done(self.report())
+
+        thread = threading.Thread(target=run, name="warm-imports", daemon=True)
+        thread.start()
+        return thread
+
+    def report(self):
+        with self._lock:
+            times = dict(self.import_times)
+        return ", ".join(f"{name} {1000 * t:.0f} ms" for name, t in times.items())
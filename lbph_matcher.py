@@ -0,0 +1,380 @@
+import math
+import os
+import struct
+import tempfile
+
+import numpy as np
+
+
+# magic, format version, radius, neighbors, grid_x, grid_y, templates, histogram length, threshold
+_HEADER = struct.Struct("<8s7id")
+_MAGIC = b"LBPHBIN\0"
+_VERSION = 1
+# elements of the (faces, rows, bins) work buffers, sized to stay in the CPU cache
+_BLOCK = 1 << 16
+# up to this many templates the matcher predicts a frame faster than cv2's
+# scan (benchmark.py frame_predict); both grow linearly with the faces, so
+# the template count alone decides
+MATCHER_MAX_TEMPLATES = 1000
+# added to h + q so empty bins give 0 / tiny instead of 0 / 0
+_TINY = np.float32(1e-30)
+_FLT_EPSILON = np.finfo(np.float32).eps
+_DBL_MAX = np.finfo(np.float64).max
+
+
+def model_bin_path(trainimagelabel_path):
+    """Binary copy of the model, stored next to Trainner.yml"""
+    return os.path.splitext(trainimagelabel_path)[0] + ".bin"
+
+
+def lbp_image(gray, radius, neighbors):
+    """Extended (circular) LBP codes, computed like OpenCV's LBPH elbp().
+
+    gray is one image or a stack of equally sized images (..., rows, cols).
+    """
+    src = np.asarray(gray)
+    rows, cols = src.shape[-2:]
+    center = src[..., radius:rows - radius, radius:cols - radius].astype(np.float32)
+    codes = np.zeros(center.shape, dtype=np.int32)
+    for n in range(neighbors):
+        # same float rounding as the C++ code, including the tiny sin/cos residues
+        x = np.float32(radius * math.cos(2.0 * math.pi * n / float(neighbors)))
+        y = np.float32(-radius * math.sin(2.0 * math.pi * n / float(neighbors)))
+        fx, fy = int(math.floor(x)), int(math.floor(y))
+        cx, cy = int(math.ceil(x)), int(math.ceil(y))
+        ty = np.float32(y - np.float32(fy))
+        tx = np.float32(x - np.float32(fx))
+        one = np.float32(1)
+        w1 = (one - tx) * (one - ty)
+        w2 = tx * (one - ty)
+        w3 = (one - tx) * ty
+        w4 = tx * ty
+
+        def shifted(dy, dx):
+            return src[..., radius + dy:rows - radius + dy,
+                       radius + dx:cols - radius + dx].astype(np.float32)
+
+        t = w1 * shifted(fy, fx) + w2 * shifted(fy, cx)
+        t = t + w3 * shifted(cy, fx)
+        t = t + w4 * shifted(cy, cx)
+        bit = (t > center) | (np.abs(t - center) < _FLT_EPSILON)
+        codes += bit.astype(np.int32) << n
+    return codes
+
+
+def spatial_histogram(codes, num_patterns, grid_x, grid_y):
+    """Normalized per-cell histograms of the LBP codes, concatenated like OpenCV's.
+
+    For a stack of code images the result has one histogram row per image.
+    """
+    codes = np.asarray(codes)
+    single = codes.ndim == 2
+    codes = codes.reshape((-1,) + codes.shape[-2:])
+    count = len(codes)
+    height = codes.shape[1] // grid_y
+    width = codes.shape[2] // grid_x
+    cells = codes[:, :grid_y * height, :grid_x * width]
+    cells = cells.reshape(count, grid_y, height, grid_x, width).transpose(0, 1, 3, 2, 4)
+    cells = cells.reshape(count, grid_y * grid_x, height * width)
+    offsets = (np.arange(count * grid_y * grid_x) * num_patterns).reshape(count, -1, 1)
+    counts = np.bincount(
+        (cells + offsets).ravel(), minlength=count * grid_y * grid_x * num_patterns
+    ).reshape(count, -1)
+    histograms = counts.astype(np.float32) * np.float32(1.0 / (height * width))
+    return histograms[0] if single else histograms
+
+
+def chisqr_alt(templates, queries, row_sums=None):
+    """OpenCV HISTCMP_CHISQR_ALT of every template row against each query histogram.
+
+    queries is one histogram or a (faces, bins) matrix; the result has one row
+    of distances per query. Uses (h - q)^2 / (h + q) = h + q - 4hq / (h + q),
+    so only the cross term is computed per pair. Blocks of template rows are
+    broadcast against all queries at once, in buffers that stay in cache.
+    """
+    queries = np.asarray(queries, dtype=np.float32)
+    single = queries.ndim == 1
+    queries = np.atleast_2d(queries)
+    if row_sums is None:
+        row_sums = np.asarray(templates).sum(axis=1, dtype=np.float64)
+    faces, dims = queries.shape
+    rows = max(1, _BLOCK // max(faces * dims, 1))
+    num = np.empty((faces, rows, dims), dtype=np.float32)
+    den = np.empty_like(num)
+    q = queries[:, None, :]
+    shifted = q + _TINY
+    cross = np.empty((faces, len(templates)), dtype=np.float64)
+    for start in range(0, len(templates), rows):
+        block = np.asarray(templates[start:start + rows], dtype=np.float32)[None]
+        n = block.shape[1]
+        a, d = num[:, :n], den[:, :n]
+        np.multiply(block, q, out=a)
+        np.add(block, shifted, out=d)
+        np.divide(a, d, out=a)
+        cross[:, start:start + n] = a.sum(axis=2)
+    query_sums = queries.sum(axis=1, dtype=np.float64)
+    distances = 2.0 * (row_sums[None, :] + query_sums[:, None] - 4.0 * cross)
+    return distances[0] if single else distances
+
+
+class LBPHMatcher:
+    """LBPH prediction in NumPy over a template matrix, a drop-in for recognizer.predict.
+
+    The histograms are one contiguous float32 matrix and the labels an int32
+    vector, read straight from the binary model with a memory map, so loading
+    costs almost nothing and the pages are shared between processes.
+    """
+
+    def __init__(self, histograms, labels, radius=1, neighbors=8, grid_x=8, grid_y=8,
+                 threshold=_DBL_MAX):
+        self.histograms = histograms
+        self.labels = labels
+        self.radius = radius
+        self.neighbors = neighbors
+        self.grid_x = grid_x
+        self.grid_y = grid_y
+        self.threshold = threshold
+        self._row_sums = None
+        self._rosters = {}
+
+    @property
+    def row_sums(self):
+        if self._row_sums is None:
+            self._row_sums = np.asarray(self.histograms).sum(axis=1, dtype=np.float64)
+        return self._row_sums
+
+    @classmethod
+    def from_recognizer(cls, recognizer):
+        histograms = recognizer.getHistograms()
+        dims = histograms[0].size if histograms else 0
+        matrix = np.empty((len(histograms), dims), dtype=np.float32)
+        for row, hist in enumerate(histograms):
+            matrix[row] = hist.ravel()
+        return cls(
+            matrix,
+            np.asarray(recognizer.getLabels(), dtype=np.int32).ravel(),
+            recognizer.getRadius(),
+            recognizer.getNeighbors(),
+            recognizer.getGridX(),
+            recognizer.getGridY(),
+            recognizer.getThreshold(),
+        )
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        with open(path, "rb") as f:
+            header = f.read(_HEADER.size)
+        if len(header) < _HEADER.size:
+            raise ValueError(f"Not a binary LBPH model: {path}")
+        magic, version, radius, neighbors, grid_x, grid_y, count, dims, threshold = \
+            _HEADER.unpack(header)
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError(f"Not a binary LBPH model: {path}")
+        labels_offset = _HEADER.size + count * dims * 4
+        if mmap and count:
+            histograms = np.memmap(path, np.float32, "r", _HEADER.size, (count, dims))
+            labels = np.memmap(path, np.int32, "r", labels_offset, (count,))
+        else:
+            with open(path, "rb") as f:
+                f.seek(_HEADER.size)
+                histograms = np.fromfile(f, np.float32, count * dims).reshape(count, dims)
+                labels = np.fromfile(f, np.int32, count)
+        return cls(histograms, labels, radius, neighbors, grid_x, grid_y, threshold)
+
+    def save(self, path):
+        tmp_path = path + ".tmp"
+        count, dims = self.histograms.shape if len(self.histograms) else (0, 0)
+        with open(tmp_path, "wb") as f:
+            f.write(_HEADER.pack(_MAGIC, _VERSION, self.radius, self.neighbors, self.grid_x,
+                                 self.grid_y, count, dims, self.threshold))
+            f.write(np.ascontiguousarray(self.histograms, dtype=np.float32).tobytes())
+            f.write(np.ascontiguousarray(self.labels, dtype=np.int32).tobytes())
+        os.replace(tmp_path, path)
+
+    def detached(self):
+        """This matcher with its arrays in memory instead of mapped from the model file"""
+        if not isinstance(self.histograms, np.memmap):
+            return self
+        return LBPHMatcher(
+            np.array(self.histograms),
+            np.array(self.labels),
+            self.radius,
+            self.neighbors,
+            self.grid_x,
+            self.grid_y,
+            self.threshold,
+        )
+
+    def to_recognizer(self):
+        """cv2 LBPH recognizer over the same templates"""
+        import cv2
+
+        fd, path = tempfile.mkstemp(suffix=".yml")
+        os.close(fd)
+        try:
+            # base64 matrices read several times faster than the text YAML
+            fs = cv2.FileStorage(path, cv2.FILE_STORAGE_WRITE | cv2.FILE_STORAGE_BASE64)
+            fs.startWriteStruct("opencv_lbphfaces", cv2.FILE_NODE_MAP)
+            fs.write("threshold", float(self.threshold))
+            fs.write("radius", int(self.radius))
+            fs.write("neighbors", int(self.neighbors))
+            fs.write("grid_x", int(self.grid_x))
+            fs.write("grid_y", int(self.grid_y))
+            fs.startWriteStruct("histograms", cv2.FILE_NODE_SEQ)
+            for row in np.asarray(self.histograms, dtype=np.float32):
+                fs.write("", row[None, :])
+            fs.endWriteStruct()
+            fs.write("labels", np.asarray(self.labels, dtype=np.int32).reshape(-1, 1))
+            fs.startWriteStruct("labelsInfo", cv2.FILE_NODE_SEQ)
+            fs.endWriteStruct()
+            fs.endWriteStruct()
+            fs.release()
+            recognizer = cv2.face.LBPHFaceRecognizer_create()
+            recognizer.read(path)
+        finally:
+            os.remove(path)
+        return recognizer
+
+    def for_roster(self, roster):
+        """Matcher over the templates of the roster's students only, built once per roster"""
+        if roster is None:
+            return self
+        key = frozenset(roster)
+        subset = self._rosters.get(key)
+        if subset is None:
+            rows = np.flatnonzero(np.isin(self.labels, np.fromiter(key, dtype=np.int64)))
+            subset = LBPHMatcher(
+                np.asarray(self.histograms)[rows],
+                np.asarray(self.labels)[rows],
+                self.radius,
+                self.neighbors,
+                self.grid_x,
+                self.grid_y,
+                self.threshold,
+            )
+            self._rosters[key] = subset
+        return subset
+
+    def histogram(self, gray):
+        codes = lbp_image(gray, self.radius, self.neighbors)
+        return spatial_histogram(codes, 2 ** self.neighbors, self.grid_x, self.grid_y)
+
+    def histogram_batch(self, crops):
+        """(faces, bins) histograms; crops of the same size go through LBP as one stack.
+
+        Cascade boxes come from a fixed ladder of window sizes, so the faces
+        of a frame share a handful of shapes. Crops are never resized, which
+        would change the histograms against recognizer.predict.
+        """
+        queries = np.empty((len(crops), self.histograms.shape[1]), dtype=np.float32)
+        groups = {}
+        for index, crop in enumerate(crops):
+            groups.setdefault(np.shape(crop), []).append(index)
+        for indexes in groups.values():
+            stack = np.stack([np.asarray(crops[i]) for i in indexes])
+            codes = lbp_image(stack, self.radius, self.neighbors)
+            queries[indexes] = spatial_histogram(
+                codes, 2 ** self.neighbors, self.grid_x, self.grid_y
+            )
+        return queries
+
+    def predict(self, gray):
+        """(label, distance) of the nearest template, (-1, DBL_MAX) above the threshold"""
+        return self.predict_batch([gray])[0]
+
+    def predict_batch(self, crops):
+        """predict() for all face crops of a frame with one pass over the templates.
+
+        Histograms are built per stack of same-sized crops and the distances in
+        one blockwise broadcast, which saves per-call overhead and template
+        memory traffic. The cost still grows linearly with faces x templates:
+        exact chi-square has no bound tight enough to skip templates, so per
+        frame latency cannot grow much slower than the face count this way.
+        In the live loop that comes from FaceTracker, which only predicts new
+        or stale tracks.
+        """
+        if not len(crops):
+            return []
+        if not len(self.labels):
+            return [(-1, _DBL_MAX)] * len(crops)
+        queries = self.histogram_batch(crops)
+        distances = chisqr_alt(self.histograms, queries, self.row_sums)
+        # argmin keeps the first of equal distances, like OpenCV's strict '<' scan
+        best = np.argmin(distances, axis=1)
+        results = []
+        for k, index in enumerate(best):
+            dist = distances[k, index]
+            if dist >= self.threshold:
+                results.append((-1, _DBL_MAX))
+            else:
+                results.append((int(self.labels[index]), float(dist)))
+        return results
+
+    def __len__(self):
+        return len(self.labels)
+
+
+def export_model(recognizer, path):
+    """Write a trained cv2 LBPH recognizer as a binary model"""
+    LBPHMatcher.from_recognizer(recognizer).save(path)
+
+
+def binary_is_current(trainimagelabel_path):
+    try:
+        return os.path.getmtime(model_bin_path(trainimagelabel_path)) >= \
+            os.path.getmtime(trainimagelabel_path)
+    except OSError:
+        return False
+
+
+def live_recognizer(matcher, roster=None, recognizer=None):
+    """Recognizer for the live loop over the roster's templates, all of them without a roster.
+
+    Up to MATCHER_MAX_TEMPLATES the matcher itself; above that a cv2
+    recognizer, which is only then built (or the one handed in for the whole
+    model is used). Only one of the two is kept, so the caller can drop the
+    matcher when a cv2 recognizer comes back.
+    """
+    subset = matcher.for_roster(roster)
+    # cv2 cannot predict with an empty model
+    if len(subset) <= MATCHER_MAX_TEMPLATES:
+        return subset
+    if roster is None and recognizer is not None:
+        return recognizer
+    return subset.to_recognizer()
+
+
+def load_model(trainimagelabel_path, mmap=True):
+    """(matcher, cv2 recognizer or None): from the binary model when it is current, else the YAML"""
+    bin_path = model_bin_path(trainimagelabel_path)
+    if binary_is_current(trainimagelabel_path):
+        try:
+            return LBPHMatcher.load(bin_path, mmap), None
+        except (OSError, ValueError) as e:
+            print(f"Cannot read binary model: {e}")
+    import cv2
+
+    recognizer = cv2.face.LBPHFaceRecognizer_create()
+    recognizer.read(trainimagelabel_path)
+    try:
+        # next load is a memory map
+        export_model(recognizer, bin_path)
+    except OSError as e:
+        print(f"Cannot write binary model: {e}")
+    return LBPHMatcher.from_recognizer(recognizer), recognizer
+
+
+def load_recognizer(trainimagelabel_path, roster=None, mmap=True):
+    """Recognizer for live prediction, limited to the roster's students when given.
+
+    The model comes from the binary copy when it is current, else from the
+    YAML; see live_recognizer for how the predicting recognizer is picked.
+    """
+    matcher, recognizer = load_model(trainimagelabel_path, mmap)
+    return live_recognizer(matcher, roster, recognizer)
+
+
+def ensure_binary_model(trainimagelabel_path):
+    """Export the binary model once before worker processes load it"""
+    if not binary_is_current(trainimagelabel_path):
+        load_model(trainimagelabel_path)
@@ -0,0 +1,193 @@
+import collections
+import datetime
+import json
+import os
+import re
+import threading
+import time
+
+
+metrics_path = "Metrics"
+QUANTILES = (0.5, 0.9, 0.99)
+
+
+class Series:
+    """Count, sum and max of a measurement, with a window of recent samples for percentiles"""
+
+    __slots__ = ("count", "total", "max", "samples")
+
+    def __init__(self, window):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples = collections.deque(maxlen=window)
+
+    def add(self, value):
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+        self.samples.append(value)
+
+    def quantiles(self):
+        ordered = sorted(self.samples)
+        if not ordered:
+            return {q: 0.0 for q in QUANTILES}
+        return {q: ordered[min(len(ordered) - 1, int(q * len(ordered)))] for q in QUANTILES}
+
+
+class _Timing:
+    __slots__ = ("metrics", "name", "start")
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.observe(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class Metrics:
+    """Stage timers, counters and value distributions of one session.
+
+    with metrics.time("detect"): ... times a stage, count() bumps a counter
+    and record() keeps the distribution of a value such as match confidence.
+    Each update is a perf_counter call and a short locked append, cheap
+    enough to leave on. write() saves percentile summaries as JSON and as a
+    Prometheus text file at the end of the session.
+    """
+
+    def __init__(self, name, window=4096):
+        self.name = name
+        self.window = window
+        self.started_at = time.time()
+        self.stages = {}
+        self.values = {}
+        self.counters = collections.Counter()
+        self._lock = threading.Lock()
+
+    def time(self, stage):
+        return _Timing(self, stage)
+
+    def observe(self, stage, seconds):
+        with self._lock:
+            series = self.stages.get(stage)
+            if series is None:
+                series = self.stages[stage] = Series(self.window)
+            series.add(seconds)
+
+    def record(self, name, value):
+        with self._lock:
+            series = self.values.get(name)
+            if series is None:
+                series = self.values[name] = Series(self.window)
+            series.add(value)
+
+    def count(self, counter, n=1):
+        with self._lock:
+            self.counters[counter] += n
+
+    def stage_count(self, stage):
+        series = self.stages.get(stage)
+        return series.count if series else 0
+
+    def summary(self):
+        with self._lock:
+            stages = {name: _summarize(s, 1000.0, "ms") for name, s in self.stages.items()}
+            values = {name: _summarize(s, 1.0, "") for name, s in self.values.items()}
+            counters = dict(self.counters)
+        ended = time.time()
+        return {
+            "session": self.name,
+            "started": datetime.datetime.fromtimestamp(self.started_at).isoformat(timespec="seconds"),
+            "ended": datetime.datetime.fromtimestamp(ended).isoformat(timespec="seconds"),
+            "elapsed_s": round(ended - self.started_at, 3),
+            "stages": stages,
+            "values": values,
+            "counters": counters,
+        }
+
+    def report(self):
+        """Short text summary for the console"""
+        summary = self.summary()
+        lines = [f"{self.name}: {summary['elapsed_s']:.1f}s"]
+        for name, s in summary["stages"].items():
+            lines.append(
+                f"  {name:<12} {s['count']:>6}  p50 {s['p50_ms']:8.2f} ms  "
+                f"p90 {s['p90_ms']:8.2f} ms  p99 {s['p99_ms']:8.2f} ms"
+            )
+        for name, count in summary["counters"].items():
+            lines.append(f"  {name:<12} {count:>6}")
+        return "\n".join(lines)
+
+    def to_prometheus(self, prefix="ams"):
+        summary = self.summary()
+        session = _label(self.name)
+        lines = [
+            f"# HELP {prefix}_stage_seconds Time spent per stage",
+            f"# TYPE {prefix}_stage_seconds summary",
+        ]
+        with self._lock:
+            stages = {name: (s.quantiles(), s.total, s.count) for name, s in self.stages.items()}
+            values = {name: (s.quantiles(), s.total, s.count) for name, s in self.values.items()}
+        for name, (quantiles, total, count) in stages.items():
+            labels = f'session="{session}",stage="{_label(name)}"'
+            for q, v in quantiles.items():
+                lines.append(f'{prefix}_stage_seconds{{{labels},quantile="{q}"}} {v:.6f}')
+            lines.append(f"{prefix}_stage_seconds_sum{{{labels}}} {total:.6f}")
+            lines.append(f"{prefix}_stage_seconds_count{{{labels}}} {count}")
+        if values:
+            lines += [
+                f"# HELP {prefix}_value Distribution of a recorded value",
+                f"# TYPE {prefix}_value summary",
+            ]
+        for name, (quantiles, total, count) in values.items():
+            labels = f'session="{session}",name="{_label(name)}"'
+            for q, v in quantiles.items():
+                lines.append(f'{prefix}_value{{{labels},quantile="{q}"}} {v:.6f}')
+            lines.append(f"{prefix}_value_sum{{{labels}}} {total:.6f}")
+            lines.append(f"{prefix}_value_count{{{labels}}} {count}")
+        lines += [
+            f"# HELP {prefix}_events_total Events counted during the session",
+            f"# TYPE {prefix}_events_total counter",
+        ]
+        for name, count in summary["counters"].items():
+            lines.append(f'{prefix}_events_total{{session="{session}",event="{_label(name)}"}} {count}')
+        lines += [
+            f"# HELP {prefix}_session_seconds Length of the last session",
+            f"# TYPE {prefix}_session_seconds gauge",
+            f'{prefix}_session_seconds{{session="{session}"}} {summary["elapsed_s"]}',
+        ]
+        return "\n".join(lines) + "\n"
+
+    def write(self, path=metrics_path):
+        """Write <path>/<name>.json and <path>/<name>.prom; returns the JSON file name"""
+        os.makedirs(path, exist_ok=True)
+        base = os.path.join(path, re.sub(r"[^\w.-]", "_", self.name))
+        for fileName, text in (
+            (base + ".json", json.dumps(self.summary(), indent=2)),
+            (base + ".prom", self.to_prometheus()),
+        ):
+            with open(fileName + ".tmp", "w") as f:
+                f.write(text)
+            os.replace(fileName + ".tmp", fileName)
+        return base + ".json"
+
+
+def _summarize(series, scale, unit):
+    suffix = f"_{unit}" if unit else ""
+    result = {"count": series.count}
+    result[f"mean{suffix}"] = round(scale * series.total / series.count, 4) if series.count else 0.0
+    for q, v in series.quantiles().items():
+        result[f"p{int(q * 100)}{suffix}"] = round(scale * v, 4)
+    result[f"max{suffix}"] = round(scale * series.max, 4)
+    return result
+
+
+def _label(text):
+    return str(text).replace("\\", "\\\\").replace('"', '\\"')
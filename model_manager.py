@@ -0,0 +1,179 @@
+import os
+import threading
+import time
+
+import cv2
+
+from lbph_matcher import LBPHMatcher, live_recognizer, load_model, model_bin_path
+from student_registry import get_registry
+from subject_roster import load_roster, rosters_path
+
+
+class ModelManager:
+    """Recognizer, Haar cascades and student registry kept in memory between sessions.
+
+    The LBPH model is read once (from its binary copy when there is one) and a
+    background thread watches the model files; when TrainImage writes a new
+    one it is loaded on that thread and swapped in, so starting a session
+    never waits for the model to load.
+    A session that is already running keeps the recognizer it started with.
+    For a subject with a roster only its students' templates are matched;
+    those subsets are cut from the model right after it is loaded. Each is
+    held once, as the NumPy matcher or, above MATCHER_MAX_TEMPLATES, as a
+    cv2 recognizer. No file mapping is kept: Windows cannot replace a mapped
+    file, and the next training run has to.
+    """
+
+    def __init__(self, model_path, cascade_path, details_path, poll_interval=2.0,
+                 loader=load_model, rosters_path=rosters_path):
+        self.model_path = model_path
+        self.cascade_path = cascade_path
+        self.details_path = details_path
+        self.rosters_path = rosters_path
+        self.poll_interval = poll_interval
+        self.loader = loader
+        self.loaded_version = None
+        self.load_seconds = None
+        self.reloads = 0
+        # live recognizer per roster, None for the whole model
+        self._recognizers = {}
+        self._detectors = []
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._watcher = None
+
+    def model_version(self):
+        """(mtime, size) of the model and its binary copy, None without a model"""
+        try:
+            stat = os.stat(self.model_path)
+        except OSError:
+            return None
+        try:
+            bin_stat = os.stat(model_bin_path(self.model_path))
+            bin_version = bin_stat.st_mtime_ns, bin_stat.st_size
+        except OSError:
+            bin_version = None
+        return stat.st_mtime_ns, stat.st_size, bin_version
+
+    def _load(self):
+        with self._load_lock:
+            version = self.model_version()
+            if version is None:
+                raise FileNotFoundError(f"Model not found: {self.model_path}")
+            if version == self.loaded_version:
+                return self._recognizers
+            start = time.perf_counter()
+            # mapped only until the live recognizer is taken from it
+            matcher, recognizer = self.loader(self.model_path)
+            recognizer = live_recognizer(matcher, None, recognizer)
+            if isinstance(recognizer, LBPHMatcher):
+                recognizer = recognizer.detached()
+            recognizers = {None: recognizer}
+            with self._lock:
+                reloaded = self.loaded_version is not None
+                self._recognizers = recognizers
+                self.loaded_version = version
+                self.load_seconds = time.perf_counter() - start
+                if reloaded:
+                    self.reloads += 1
+            print(
+                f"Loaded model {self.model_path} in {self.load_seconds:.2f}s, "
+                f"predicting with {type(recognizers[None]).__name__}"
+            )
+            return recognizers
+
+    def recognizer(self, subject=None):
+        """Current recognizer, limited to the subject's roster when it has one.
+
+        Loads the model now if it has never been loaded.
+        """
+        with self._lock:
+            recognizers = self._recognizers
+        if not recognizers:
+            recognizers = self._load()
+        roster = None if subject is None else load_roster(subject, self.rosters_path)
+        recognizer = recognizers.get(roster)
+        if recognizer is None:
+            full = recognizers[None]
+            if not isinstance(full, LBPHMatcher):
+                # the whole model went to cv2; cut the roster from the mapped binary
+                full = self.loader(self.model_path)[0]
+            recognizer = live_recognizer(full, roster)
+            if isinstance(recognizer, LBPHMatcher):
+                recognizer = recognizer.detached()
+            recognizers[roster] = recognizer
+        return recognizer
+
+    def _prepare_rosters(self):
+        if not os.path.isdir(self.rosters_path):
+            return
+        for fileName in os.listdir(self.rosters_path):
+            subject, ext = os.path.splitext(fileName)
+            if ext == ".csv":
+                self.recognizer(subject)
+
+    def detectors(self, count):
+        """count resident cascades, one per pipeline worker thread"""
+        with self._lock:
+            while len(self._detectors) < count:
+                detector = cv2.CascadeClassifier(self.cascade_path)
+                if detector.empty():
+                    raise ValueError(f"Failed to load face detection model {self.cascade_path}")
+                self._detectors.append(detector)
+            return self._detectors[:count]
+
+    def registry(self):
+        # get_registry reloads studentdetails.csv itself when it changes
+        return get_registry(self.details_path)
+
+    def is_stale(self):
+        version = self.model_version()
+        return version is not None and version != self.loaded_version
+
+    def start(self, preload=True):
+        """Watch the model file; with preload also load it in the background now"""
+        if self._watcher is None:
+            self._watcher = threading.Thread(
+                target=self._watch, args=(preload,), name="model-watcher", daemon=True
+            )
+            self._watcher.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _watch(self, preload):
+        if preload:
+            self._reload_quietly()
+        while not self._stop.wait(self.poll_interval):
+            version = self.model_version()
+            if version is None or version == self.loaded_version:
+                continue
+            # wait until the file has stopped changing before reading it
+            if self._stop.wait(0.5) or self.model_version() != version:
+                continue
+            self._reload_quietly()
+
+    def _reload_quietly(self):
+        try:
+            self._load()
+            self._prepare_rosters()
+            self.registry()
+        except Exception as e:
+            print(f"Model not loaded: {e}")
+
+
+_managers = {}
+_managers_lock = threading.Lock()
+
+
+def get_model_manager(model_path, cascade_path, details_path):
+    """Shared, already watching manager for a model file"""
+    key = os.path.abspath(model_path)
+    with _managers_lock:
+        manager = _managers.get(key)
+        if manager is None:
+            manager = _managers[key] = ModelManager(model_path, cascade_path, details_path)
+            manager.start()
+        return manager
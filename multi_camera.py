@@ -0,0 +1,121 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+
+from attendance_ledger import AttendanceLedger
+from face_detection import detection_config
+from face_tracker import FaceTracker
+from frame_sources import open_source
+from lbph_matcher import ensure_binary_model, load_recognizer
+from metrics import Metrics
+from recognition_pipeline import RecognitionPipeline
+
+
+class CameraReport:
+    """Frame rate and recognition counts of one camera in a session"""
+
+    def __init__(self, index, source, frames, elapsed, predictions, recognitions, students):
+        self.index = index
+        self.source = source
+        self.frames = frames
+        self.elapsed = elapsed
+        self.predictions = predictions
+        self.recognitions = recognitions
+        self.students = students
+
+    @property
+    def fps(self):
+        return self.frames / self.elapsed if self.elapsed > 0 else 0.0
+
+    def __str__(self):
+        return (
+            f"Camera {self.index} ({self.source}): {self.fps:.1f} fps over {self.frames} frames, "
+            f"{self.predictions} predictions, {self.recognitions} recognitions, "
+            f"{self.students} students"
+        )
+
+
+def run_camera(index, source, haarcasecade_path, trainimagelabel_path, duration,
+               detection_mode="fast", threshold=70, show=True, roster=None, target_fps=None,
+               face_size=None):
+    """One camera of a session; runs in its own process and returns (ledger, report)"""
+    recognizer = load_recognizer(trainimagelabel_path, roster)
+    cam = open_source(source)
+    ledger = AttendanceLedger()
+    recognitions = 0
+    window = f"Camera {index}"
+
+    pipeline = RecognitionPipeline(
+        cam,
+        haarcasecade_path,
+        recognizer,
+        tracker=FaceTracker(),
+        detection=detection_config(detection_mode, face_size),
+        metrics=Metrics(f"attendance_camera{index}"),
+        target_fps=target_fps,
+    )
+    pipeline.start()
+    try:
+        for im, found in pipeline.results(time.time() + duration):
+            for (x, y, w, h, Id, conf) in found:
+                if conf < threshold:
+                    recognitions += 1
+                    ledger.record(Id, "", conf)
+                    color = (0, 260, 0)
+                else:
+                    color = (0, 25, 255)
+                if show and im is not None:
+                    cv2.rectangle(im, (x, y), (x + w, y + h), color, 4)
+            if show and im is not None:
+                cv2.imshow(window, im)
+                if cv2.waitKey(1) & 0xFF == 27:
+                    break
+    finally:
+        pipeline.stop()
+        cam.release()
+        if show:
+            cv2.destroyWindow(window)
+        pipeline.metrics.write()
+
+    report = CameraReport(
+        index,
+        source,
+        pipeline.metrics.stage_count("consume"),
+        pipeline.stopped_at - pipeline.started_at,
+        pipeline.metrics.counters["predictions"],
+        recognitions,
+        len(ledger),
+    )
+    return ledger, report
+
+
+def run_session(sources, haarcasecade_path, trainimagelabel_path, duration,
+                registry=None, detection_mode="fast", threshold=70, show=True, roster=None,
+                target_fps=None, face_size=None):
+    """Drive every camera in sources at once and merge them into one ledger.
+
+    Each camera gets its own process so detection and recognition for the
+    cameras run on separate cores. A student seen by several cameras is
+    counted once, with the earliest first-seen time.
+    """
+    ledger = AttendanceLedger()
+    reports = []
+    ensure_binary_model(trainimagelabel_path)
+    with ProcessPoolExecutor(max_workers=len(sources)) as executor:
+        futures = [
+            executor.submit(
+                run_camera, index, source, haarcasecade_path, trainimagelabel_path,
+                duration, detection_mode, threshold, show, roster, target_fps, face_size,
+            )
+            for index, source in enumerate(sources)
+        ]
+        for future in futures:
+            camera_ledger, report = future.result()
+            ledger.merge(camera_ledger)
+            reports.append(report)
+
+    if registry is not None:
+        for entry in ledger:
+            entry.name = registry.name(entry.enrollment)
+    return ledger, reports
@@ -0,0 +1,73 @@
+import argparse
+import os
+
+import cv2
+
+from face_archive import FaceArchiveWriter, has_archive
+from trainImage import FACE_SIZE, list_student_dirs, list_student_images, preprocess_face
+
+
+def pack_student(student_path, detector, delete_images=False):
+    """Convert one student's loose images into a packed archive.
+
+    Returns (samples packed, images without a usable face). With
+    delete_images the packed images are deleted once the archive is written;
+    images without a usable face are always kept, another detector setting
+    may still use them.
+    """
+    student_dir = os.path.basename(student_path)
+    enrollment, _, name = student_dir.partition("_")
+    writer = FaceArchiveWriter(student_path, enrollment, name, FACE_SIZE)
+    image_files = sorted(
+        f for f in os.listdir(student_path) if f.lower().endswith((".png", ".jpg", ".jpeg"))
+    )
+    skipped = 0
+    packed_files = []
+    for image_file in image_files:
+        image = cv2.imread(os.path.join(student_path, image_file), cv2.IMREAD_GRAYSCALE)
+        face_img = None if image is None else preprocess_face(image, detector)
+        if face_img is None:
+            skipped += 1
+            continue
+        writer.add(face_img, source=image_file)
+        packed_files.append(image_file)
+    packed = len(writer)
+    writer.close()
+    if packed and delete_images:
+        for image_file in packed_files:
+            os.remove(os.path.join(student_path, image_file))
+    return packed, skipped
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Pack each TrainingImage/<enrollment>_<name>/ folder of JPEGs into one archive"
+    )
+    parser.add_argument("trainimage_path", nargs="?", default="TrainingImage")
+    parser.add_argument("--cascade", default="haarcascade_frontalface_default.xml")
+    parser.add_argument("--delete-images", action="store_true",
+                        help="delete the packed JPEG files; images without a usable face are kept")
+    args = parser.parse_args()
+
+    detector = cv2.CascadeClassifier(args.cascade)
+    if detector.empty():
+        raise SystemExit(f"Cannot load {args.cascade}")
+
+    students = packed_total = skipped_total = 0
+    for student_id, student_dir, student_path in list_student_dirs(args.trainimage_path):
+        if has_archive(student_path) or not list_student_images(student_path):
+            continue
+        packed, skipped = pack_student(student_path, detector, args.delete_images)
+        students += 1
+        packed_total += packed
+        skipped_total += skipped
+        print(f"{student_dir}: {packed} samples packed, {skipped} without a face")
+    print(
+        f"Packed {packed_total} samples of {students} students "
+        f"({skipped_total} images without a usable face were left out). "
+        "The next training run rebuilds the model."
+    )
+
+
+if __name__ == "__main__":
+    main()
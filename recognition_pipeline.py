@@ -0,0 +1,242 @@
+import os
+import queue
+import threading
+import time
+from collections import namedtuple
+
+import cv2
+
+from face_detection import detect_faces, detect_faces_roi
+from frame_scheduler import FrameScheduler
+from metrics import Metrics
+
+
+# One recognized (or unknown) face in a frame
+FaceMatch = namedtuple("FaceMatch", ["x", "y", "w", "h", "Id", "conf"])
+
+
+def predict_faces(recognizer, crops):
+    """(Id, conf) for every crop, as one batch when the recognizer supports it.
+
+    Only LBPHMatcher batches; load_recognizer hands one out only for models
+    small enough that it beats the cv2 recognizer's predict loop.
+    """
+    if not crops:
+        return []
+    predict_batch = getattr(recognizer, "predict_batch", None)
+    if predict_batch is not None:
+        return predict_batch(crops)
+    return [recognizer.predict(crop) for crop in crops]
+
+
+def recognize_faces(recognizer, gray, faces, seq=0, tracker=None):
+    """FaceMatch for every detected face, and how many needed a prediction.
+
+    All faces of the frame that need a prediction go to the recognizer as one
+    batch. With a FaceTracker only new or stale tracks are predicted; the
+    other faces reuse their track's label.
+    """
+    if tracker is None:
+        faces = list(faces)
+        predictions = predict_faces(
+            recognizer, [gray[y : y + h, x : x + w] for (x, y, w, h) in faces]
+        )
+        found = [
+            FaceMatch(x, y, w, h, Id, conf)
+            for (x, y, w, h), (Id, conf) in zip(faces, predictions)
+        ]
+        return found, len(found)
+
+    tracked = tracker.update(seq, faces)
+    crops = [
+        gray[y : y + h, x : x + w]
+        for (x, y, w, h), track, needs_predict in tracked
+        if needs_predict
+    ]
+    predicted = iter(predict_faces(recognizer, crops))
+
+    found = []
+    for (x, y, w, h), track, needs_predict in tracked:
+        if needs_predict:
+            Id, conf = next(predicted)
+            tracker.assign(track, Id, conf)
+        else:
+            Id, conf = track.Id, track.conf
+        found.append(FaceMatch(x, y, w, h, Id, conf))
+    return found, len(crops)
+
+
+def default_workers():
+    """Leave one core for the grabber and the preview window"""
+    return max(1, min(4, (os.cpu_count() or 2) - 1))
+
+
+class RecognitionPipeline:
+    """Grabber thread -> bounded frame queue -> detect/recognize workers -> consumer.
+
+    The camera is read on its own thread so a slow detection pass never stalls
+    the capture. When the frame queue is full the oldest frame is dropped, which
+    keeps the preview close to real time. Results are consumed on the calling
+    thread through results(), which is where the attendance ledger and the
+    OpenCV window are updated. With a target_fps a FrameScheduler drops
+    stale frames and runs the full cascade less often while the workers
+    cannot keep up.
+    """
+
+    def __init__(self, cam, haarcasecade_path, recognizer, workers=None, queue_size=4,
+                 tracker=None, detection=None, detectors=None, metrics=None,
+                 target_fps=None):
+        self.cam = cam
+        self.haarcasecade_path = haarcasecade_path
+        self.recognizer = recognizer
+        # optional FaceTracker: predict once per tracked face instead of every frame
+        self.tracker = tracker
+        # DetectionConfig for the cascade, full resolution when None
+        self.detection = detection
+        self.workers = workers or default_workers()
+        # optional resident CascadeClassifiers, one per worker
+        self.detectors = detectors
+        self.frames = queue.Queue(maxsize=queue_size)
+        self.matches = queue.Queue(maxsize=queue_size * 2)
+        self.stop_event = threading.Event()
+        self.threads = []
+        self.dropped = 0
+        self.late = 0
+        # stage timings and counters, shared with the consumer for its own stages
+        self.metrics = metrics or Metrics("pipeline")
+        self.scheduler = FrameScheduler(target_fps, self.workers) if target_fps else None
+        self.started_at = None
+        self.stopped_at = None
+
+    def start(self):
+        self.started_at = time.time()
+        grabber = threading.Thread(target=self._grab, name="grabber", daemon=True)
+        self.threads.append(grabber)
+        for i in range(self.workers):
+            worker = threading.Thread(
+                target=self._work, args=(i,), name=f"worker-{i}", daemon=True
+            )
+            self.threads.append(worker)
+        for thread in self.threads:
+            thread.start()
+        return self
+
+    def stop(self):
+        self.stop_event.set()
+        for thread in self.threads:
+            thread.join(timeout=2)
+        self.stopped_at = time.time()
+
+    def _grab(self):
+        seq = 0
+        while not self.stop_event.is_set():
+            start = time.perf_counter()
+            ret, im = self.cam.read()
+            if not ret or im is None:
+                time.sleep(0.01)
+                continue
+            grabbed = time.perf_counter()
+            self.metrics.observe("read", grabbed - start)
+            seq += 1
+            # Drop the oldest frame instead of blocking the camera
+            while True:
+                try:
+                    self.frames.put_nowait((seq, grabbed, im))
+                    break
+                except queue.Full:
+                    try:
+                        self.frames.get_nowait()
+                        self.dropped += 1
+                        self.metrics.count("dropped")
+                    except queue.Empty:
+                        pass
+
+    def _work(self, index):
+        # CascadeClassifier is not safe to share between threads
+        if self.detectors and index < len(self.detectors):
+            detector = self.detectors[index]
+        else:
+            detector = cv2.CascadeClassifier(self.haarcasecade_path)
+        while not self.stop_event.is_set():
+            try:
+                seq, grabbed, im = self.frames.get(timeout=0.1)
+            except queue.Empty:
+                continue
+
+            metrics = self.metrics
+            scheduler = self.scheduler
+            if scheduler is not None and scheduler.is_stale(grabbed):
+                metrics.count("stale")
+                continue
+
+            began = time.perf_counter()
+            with metrics.time("convert"):
+                gray = cv2.cvtColor(im, cv2.COLOR_BGR2GRAY)
+            full, boxes = scheduler.plan(seq) if scheduler is not None else (True, None)
+            if full:
+                with metrics.time("detect"):
+                    faces = detect_faces(gray, detector, self.detection)
+            else:
+                with metrics.time("detect_roi"):
+                    faces = detect_faces_roi(gray, detector, boxes, self.detection)
+
+            start = time.perf_counter()
+            found, predicted = recognize_faces(
+                self.recognizer, gray, faces, seq, self.tracker
+            )
+            if predicted:
+                metrics.observe("predict", time.perf_counter() - start)
+            if scheduler is not None:
+                change = scheduler.observe(full, faces, time.perf_counter() - began)
+                if change > 0:
+                    metrics.count("degraded")
+                elif change < 0:
+                    metrics.count("restored")
+            metrics.count("frames")
+            metrics.count("faces", len(found))
+            metrics.count("predictions", predicted)
+            metrics.count("tracked", len(found) - predicted)
+
+            while not self.stop_event.is_set():
+                try:
+                    self.matches.put((seq, grabbed, im, found), timeout=0.1)
+                    break
+                except queue.Full:
+                    continue
+
+    def results(self, deadline):
+        """Yield (frame, [FaceMatch, ...]) until the deadline.
+
+        Frames are shown in capture order: a result that arrives after a newer
+        frame is yielded with frame None, so its faces still count but the
+        preview never steps back.
+        """
+        last_seq = 0
+        while time.time() < deadline and not self.stop_event.is_set():
+            try:
+                seq, grabbed, im, found = self.matches.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            start = time.perf_counter()
+            # Workers may finish out of order; never show an older frame
+            if seq < last_seq:
+                self.late += 1
+                self.metrics.count("late")
+                im = None
+            else:
+                last_seq = seq
+                self.metrics.observe("latency", start - grabbed)
+                if self.scheduler is not None:
+                    self.scheduler.observe_latency(start - grabbed)
+            yield im, found
+            self.metrics.observe("consume", time.perf_counter() - start)
+
+    def report(self):
+        end = self.stopped_at or time.time()
+        elapsed = end - (self.started_at or end)
+        lines = [f"Pipeline ran {elapsed:.1f}s with {self.workers} workers"]
+        lines.append(self.metrics.report())
+        if self.scheduler is not None:
+            lines.append(self.scheduler.report())
+        lines.append(f"dropped {self.dropped} frames, {self.late} late frames not shown")
+        return "\n".join(lines)
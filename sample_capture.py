@@ -0,0 +1,109 @@
+import queue
+import threading
+
+import cv2
+import numpy as np
+
+
+class ImageWriter:
+    """Writes images on a background thread so the capture loop never waits on disk"""
+
+    def __init__(self, queue_size=64):
+        self.jobs = queue.Queue(maxsize=queue_size)
+        self.written = 0
+        self.errors = []
+        self._thread = threading.Thread(target=self._run, name="image-writer", daemon=True)
+        self._thread.start()
+
+    def write(self, fileName, image):
+        self.jobs.put((fileName, np.ascontiguousarray(image)))
+
+    def _run(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                break
+            fileName, image = job
+            try:
+                if not cv2.imwrite(fileName, image):
+                    raise OSError(f"Cannot write {fileName}")
+                self.written += 1
+            except Exception as e:
+                self.errors.append(e)
+
+    def close(self):
+        """Wait for every queued image; raises the first write error"""
+        self.jobs.put(None)
+        self._thread.join()
+        if self.errors:
+            raise self.errors[0]
+
+
+class SampleGate:
+    """Keeps only sharp face crops that differ from the ones already kept.
+
+    Sharpness is the variance of the Laplacian. Similarity is the normalized
+    correlation of small thumbnails against every kept crop, so a student
+    sitting still does not fill the folder with copies of one frame. After
+    patience rejected crops in a row, blurry or similar, the similarity check
+    is skipped and the sharpness threshold drops to the sharpest crop seen
+    since the last kept one; after twice patience any crop is taken. A dim
+    room or a soft camera therefore slows a registration down but never
+    stalls it.
+    """
+
+    def __init__(self, min_sharpness=30.0, max_similarity=0.92, patience=45, thumb_size=(48, 48)):
+        self.min_sharpness = min_sharpness
+        self.max_similarity = max_similarity
+        self.patience = patience
+        self.thumb_size = thumb_size
+        self.kept = []
+        self.blurry = 0
+        self.similar = 0
+        self._rejected_in_row = 0
+        self._sharpest_in_row = 0.0
+
+    @staticmethod
+    def sharpness(gray):
+        return cv2.Laplacian(gray, cv2.CV_64F).var()
+
+    def _thumbnail(self, gray):
+        thumb = cv2.resize(gray, self.thumb_size, interpolation=cv2.INTER_AREA).astype(np.float32)
+        thumb -= thumb.mean()
+        norm = np.linalg.norm(thumb)
+        return thumb / norm if norm > 0 else thumb
+
+    def _min_sharpness(self):
+        if self._rejected_in_row >= 2 * self.patience:
+            return 0.0
+        if self._rejected_in_row >= self.patience:
+            return min(self.min_sharpness, self._sharpest_in_row)
+        return self.min_sharpness
+
+    def accept(self, gray):
+        sharpness = self.sharpness(gray)
+        if sharpness < self._min_sharpness():
+            self.blurry += 1
+            self._reject(sharpness)
+            return False
+        thumb = self._thumbnail(gray)
+        if self.kept and self._rejected_in_row < self.patience:
+            similarity = max(float(np.vdot(thumb, kept)) for kept in self.kept)
+            if similarity > self.max_similarity:
+                self.similar += 1
+                self._reject(sharpness)
+                return False
+        self.kept.append(thumb)
+        self._rejected_in_row = 0
+        self._sharpest_in_row = 0.0
+        return True
+
+    def _reject(self, sharpness):
+        self._rejected_in_row += 1
+        self._sharpest_in_row = max(self._sharpest_in_row, sharpness)
+
+    def report(self):
+        return (
+            f"kept {len(self.kept)} samples, skipped {self.blurry} blurry "
+            f"and {self.similar} near-duplicate crops"
+        )
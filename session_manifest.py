@@ -0,0 +1,91 @@
+import json
+import os
+
+import pandas as pd
+
+
+class SessionManifest:
+    """Per-subject record of the session sheets already ingested.
+
+    Kept as Attendance/<subject>/manifest.json next to a pickled copy of the
+    last merged result. For each sheet it stores size, mtime and the exact
+    session timestamp, so a view only reads sheets that are new or changed,
+    and the merged result is only rebuilt when the store has changed since.
+    """
+
+    FILE_NAME = "manifest.json"
+    MERGED_NAME = ".merged.pkl"
+
+    def __init__(self, subject_dir):
+        self.subject_dir = subject_dir
+        self.path = os.path.join(subject_dir, self.FILE_NAME)
+        self.merged_path = os.path.join(subject_dir, self.MERGED_NAME)
+        self.sessions = {}
+        self.store_version = None
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+            self.sessions = data.get("sessions", {})
+            version = data.get("store_version")
+            self.store_version = tuple(version) if version is not None else None
+        except (OSError, ValueError):
+            self.sessions = {}
+            self.store_version = None
+
+    def save(self):
+        os.makedirs(self.subject_dir, exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(
+                {"sessions": self.sessions, "store_version": self.store_version},
+                f,
+                indent=1,
+            )
+        os.replace(tmp_path, self.path)
+
+    @staticmethod
+    def fingerprint(f):
+        stat = os.stat(f)
+        return stat.st_size, stat.st_mtime_ns
+
+    def changed_sheets(self, filenames):
+        """(new or changed sheets, names of sheets that disappeared)"""
+        changed = []
+        seen = set()
+        for f in filenames:
+            name = os.path.basename(f)
+            seen.add(name)
+            size, mtime_ns = self.fingerprint(f)
+            entry = self.sessions.get(name)
+            if entry is None or entry["size"] != size or entry["mtime_ns"] != mtime_ns:
+                changed.append(f)
+        removed = [name for name in self.sessions if name not in seen]
+        return changed, removed
+
+    def record(self, f, recorded_at):
+        size, mtime_ns = self.fingerprint(f)
+        self.sessions[os.path.basename(f)] = {
+            "size": size,
+            "mtime_ns": mtime_ns,
+            "recorded_at": recorded_at.strftime("%Y-%m-%d %H:%M:%S"),
+        }
+
+    def forget(self, name):
+        self.sessions.pop(name, None)
+
+    def cached_merge(self, store_version):
+        """The last merged result if the store has not changed since"""
+        if self.store_version != tuple(store_version) or not os.path.exists(self.merged_path):
+            return None
+        try:
+            return pd.read_pickle(self.merged_path)
+        except Exception:
+            return None
+
+    def save_merge(self, merged_df, store_version):
+        os.makedirs(self.subject_dir, exist_ok=True)
+        merged_df.to_pickle(self.merged_path)
+        self.store_version = tuple(store_version)
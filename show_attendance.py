@@ -2,10 +2,105 @@ import pandas as pd
 from glob import glob
 import os
 import tkinter as tk
-from tkinter import ttk, messagebox
-from typing import List
+from tkinter import messagebox
 from datetime import datetime
 
+from attendance_store import get_store
+from session_manifest import SessionManifest
+from student_registry import get_registry
+from virtual_table import VirtualTable
+
+
+SHEET_TIME_FORMATS = (
+    "%Y-%m-%d_%H-%M-%S",  # automaticAttedance / batch_attendance
+    "%Y%m%d-%H%M%S",
+    "%Y%m%d_%H%M%S",  # takemanually
+)
+
+
+def sheet_timestamp(f, subject):
+    """Recording time encoded in a <subject>_<timestamp>.csv sheet name"""
+    stem = os.path.splitext(os.path.basename(f))[0]
+    if stem.startswith(subject + '_'):
+        stem = stem[len(subject) + 1:]
+    for fmt in SHEET_TIME_FORMATS:
+        try:
+            return datetime.strptime(stem, fmt)
+        except ValueError:
+            continue
+    return None
+
+
+def import_sheet(store, subject, f, registry):
+    """Copy one session sheet into the attendance store, returns its session time"""
+    df = pd.read_csv(f)
+    if 'Enrollment' not in df.columns:
+        raise ValueError("no Enrollment column")
+    # Take names from the registry, older sheets have them in brackets
+    names = registry.name_series(df['Enrollment'], df['Name'] if 'Name' in df.columns else None)
+    recorded_at = sheet_timestamp(f, subject) or datetime.fromtimestamp(os.path.getmtime(f))
+    statuses = df['Status'] if 'Status' in df.columns else ['Present'] * len(df)
+    rows = [
+        (enrollment, name, status, None, None)
+        for enrollment, name, status in zip(df['Enrollment'], names, statuses)
+        if pd.notna(enrollment)
+    ]
+    store.add_session(subject, recorded_at, rows, source=os.path.abspath(f))
+    return recorded_at
+
+
+def merge_attendance(subject, attendance_path="Attendance", registry=None, store=None):
+    """All attendance of a subject from the store, also exported as attendance.csv.
+
+    Session sheets on disk (older sessions, or ones written with session_csv
+    enabled) are tracked in the subject's manifest: only sheets that are new
+    or changed since the last view are read into the store, and sessions of
+    deleted sheets are dropped. The merged result and attendance.csv are only
+    rebuilt when the store changed. Returns None when the subject has no
+    attendance at all.
+    """
+    store = store or get_store(os.path.join(attendance_path, "attendance.db"))
+    subject_dir = os.path.join(attendance_path, subject)
+    manifest = SessionManifest(subject_dir)
+    if manifest.sessions and store.version(subject)[0] == 0:
+        # the store was reset, ingest every sheet again
+        manifest.sessions = {}
+
+    filenames = glob(os.path.join(subject_dir, f"{subject}_*.csv"))
+    changed, removed = manifest.changed_sheets(filenames)
+    for name in removed:
+        store.remove_source(os.path.abspath(os.path.join(subject_dir, name)))
+        manifest.forget(name)
+    if changed:
+        registry = registry or get_registry()
+    for f in changed:
+        try:
+            if os.path.basename(f) not in manifest.sessions and store.has_source(os.path.abspath(f)):
+                # written by FillAttendance together with its store session
+                manifest.record(f, sheet_timestamp(f, subject) or datetime.fromtimestamp(os.path.getmtime(f)))
+                continue
+            manifest.record(f, import_sheet(store, subject, f, registry))
+        except Exception as e:
+            print(f"Error reading {f}: {str(e)}")
+
+    version = store.version(subject)
+    if version[0] == 0:
+        return None
+
+    dirty = bool(changed or removed)
+    merged_df = None if dirty else manifest.cached_merge(version)
+    if merged_df is None:
+        merged_df = store.query(subject)
+        # Save merged attendance
+        os.makedirs(subject_dir, exist_ok=True)
+        merged_df.to_csv(os.path.join(subject_dir, "attendance.csv"), index=False)
+        manifest.save_merge(merged_df, version)
+        dirty = True
+    if dirty:
+        manifest.save()
+    return merged_df
+
+
 def subjectchoose(text_to_speech):
     def calculate_attendance():
         subject = tx.get().strip()  # Define subject here
@@ -14,53 +109,15 @@ def subjectchoose(text_to_speech):
             return
         
         try:
-            # Get all attendance files for the subject
-            filenames = glob(f"Attendance\\{subject}\\{subject}_*.csv")
-            if not filenames:
+            merged_df = merge_attendance(subject)
+            if merged_df is None:
                 text_to_speech(f"No attendance files found for {subject}")
                 return
 
-            # Read and merge all CSV files
-            dfs: List[pd.DataFrame] = []
-            for f in filenames:
-                try:
-                    df = pd.read_csv(f)
-                    # Clean name fields if they have brackets
-                    if 'Name' in df.columns:
-                        df['Name'] = df['Name'].str.replace(r'[\[\]\']', '', regex=True)
-                    
-                    # Extract date and time from filename
-                    try:
-                        timestamp_str = os.path.basename(f).split('_')[-1].split('.')[0]
-                        timestamp = datetime.strptime(timestamp_str, "%Y%m%d-%H%M%S")
-                        df['Recorded_At'] = timestamp.strftime("%Y-%m-%d %H:%M:%S")
-                    except:
-                        df['Recorded_At'] = "Unknown"
-                        
-                    dfs.append(df)
-                except Exception as e:
-                    print(f"Error reading {f}: {str(e)}")
-
-            if not dfs:
+            if merged_df.empty:
                 text_to_speech("No valid attendance data found")
                 return
 
-            # Merge all DataFrames
-            merged_df = pd.concat(dfs, ignore_index=True)
-            merged_df.fillna('', inplace=True)
-
-            # Remove Attendance column if it exists
-            if 'Attendance' in merged_df.columns:
-                merged_df = merged_df.drop(columns=['Attendance'])
-
-            # Reorder columns to show timing information first
-            cols = ['Recorded_At'] + [col for col in merged_df.columns if col != 'Recorded_At']
-            merged_df = merged_df[cols]
-
-            # Save merged attendance
-            output_path = f"Attendance\\{subject}\\attendance.csv"
-            merged_df.to_csv(output_path, index=False)
-
             # Display in GUI
             display_attendance(merged_df, subject)
 
@@ -75,22 +132,17 @@ def subjectchoose(text_to_speech):
         root.configure(background="black")
         root.geometry("1000x600")
 
-        # Create frame for treeview and scrollbar
-        frame = tk.Frame(root)
-        frame.pack(fill=tk.BOTH, expand=True)
-
-        # Treeview widget
-        tree = ttk.Treeview(frame, columns=list(df.columns), show="headings")
-        
-        # Add scrollbars
-        vsb = ttk.Scrollbar(frame, orient="vertical", command=tree.yview)
-        hsb = ttk.Scrollbar(frame, orient="horizontal", command=tree.xview)
-        tree.configure(yscrollcommand=vsb.set, xscrollcommand=hsb.set)
-
-        # Grid layout
-        tree.grid(row=0, column=0, sticky='nsew')
-        vsb.grid(row=0, column=1, sticky='ns')
-        hsb.grid(row=1, column=0, sticky='ew')
+        # Filter box, matched against every column
+        filter_frame = tk.Frame(root, bg="black")
+        filter_frame.pack(fill=tk.X, padx=5, pady=5)
+        tk.Label(
+            filter_frame, text="Filter", bg="black", fg="yellow", font=("times new roman", 12)
+        ).pack(side=tk.LEFT)
+        filter_var = tk.StringVar(master=root)
+        filter_entry = tk.Entry(filter_frame, textvariable=filter_var, width=30)
+        filter_entry.pack(side=tk.LEFT, padx=5)
+        status = tk.Label(filter_frame, bg="black", fg="yellow", font=("times new roman", 12))
+        status.pack(side=tk.RIGHT)
 
         # Configure column headings and widths
         col_widths = {
@@ -100,26 +152,29 @@ def subjectchoose(text_to_speech):
             'Date': 100,
             'Status': 80
         }
-        
-        for col in df.columns:
-            tree.heading(col, text=col)
-            tree.column(col, 
-                       width=col_widths.get(col, 100), 
-                       anchor='center' if col == 'Recorded_At' else 'w')
 
-        # Add data to treeview
-        for _, row in df.iterrows():
-            tree.insert("", tk.END, values=list(row))
+        # Only the visible rows are put into the Treeview
+        table = VirtualTable(root, df, col_widths=col_widths, anchors={'Recorded_At': 'center'})
+        table.pack(fill=tk.BOTH, expand=True)
+
+        def update_status(event=None):
+            shown = len(table.view)
+            first = table.offset + 1 if shown else 0
+            last = min(table.offset + table.visible_rows, shown)
+            text = f"Rows {first}-{last} of {shown}"
+            if shown != len(df):
+                text += f" (filtered from {len(df)})"
+            status.configure(text=text)
 
-        # Configure grid weights
-        frame.grid_rowconfigure(0, weight=1)
-        frame.grid_columnconfigure(0, weight=1)
+        table.bind("<<TableRefreshed>>", update_status)
+        filter_entry.bind("<Return>", lambda e: table.filter_rows(filter_var.get()))
+        update_status()
 
         # Add export button
         export_btn = tk.Button(
             root,
             text="Export to CSV",
-            command=lambda: export_csv(df, subject),  # Pass subject here
+            command=lambda: export_csv(table.current_frame(), subject),  # Pass subject here
             bd=3,
             font=("times new roman", 12),
             bg="black",
@@ -148,6 +203,10 @@ def subjectchoose(text_to_speech):
             text_to_speech("Please enter the subject name")
         else:
             folder_path = f"Attendance\\{subject}"
+            store = get_store()
+            if store.version(subject)[0]:
+                # sheets now live in the store, export the subject first
+                store.export_csv(subject, os.path.join("Attendance", subject, "attendance.csv"))
             if os.path.exists(folder_path):
                 os.startfile(folder_path)
             else:
@@ -0,0 +1,197 @@
+import collections
+import hashlib
+import os
+import threading
+import time
+
+try:
+    import winsound
+except ImportError:  # not on Windows
+    winsound = None
+
+
+speech_cache_path = os.path.join("UI_Image", "speech_cache")
+
+# prompts spoken often enough to be worth rendering to audio ahead of time
+COMMON_PHRASES = (
+    "Please enter the subject name!!!",
+    "Please enter the subject name.",
+    "Please Enter your Enrollment Number and Name.",
+    "Please Enter your Enrollment Number.",
+    "Please Enter your Name.",
+    "Model not found,please train model",
+    "Training completed successfully",
+    "Training failed. Please check console for details.",
+)
+
+
+class NullBackend:
+    """Speaks nothing; used for headless and test runs"""
+
+    def open(self):
+        pass
+
+    def speak(self, text):
+        pass
+
+    def render(self, text, fileName):
+        return False
+
+    def close(self):
+        pass
+
+
+class Pyttsx3Backend:
+    """One pyttsx3 engine, created and used on the speech thread only"""
+
+    def __init__(self):
+        self.engine = None
+
+    def open(self):
+        import pyttsx3
+
+        self.engine = pyttsx3.init()
+
+    def speak(self, text):
+        self.engine.say(text)
+        self.engine.runAndWait()
+
+    def render(self, text, fileName):
+        self.engine.save_to_file(text, fileName)
+        self.engine.runAndWait()
+        return os.path.exists(fileName) and os.path.getsize(fileName) > 0
+
+    def close(self):
+        if self.engine is not None:
+            self.engine.stop()
+            self.engine = None
+
+
+class SpeechService:
+    """Non-blocking text to speech on a background thread.
+
+    say() only queues the text and returns. A message that is already queued,
+    or was spoken less than repeat_after seconds ago, is dropped, and when more
+    than max_pending messages wait the oldest ones are skipped. Common phrases
+    are rendered to WAV files once and played with winsound, which is much
+    faster than synthesizing them again.
+    """
+
+    def __init__(self, backend=None, cache_path=speech_cache_path, phrases=COMMON_PHRASES,
+                 max_pending=3, repeat_after=3.0):
+        self.backend = backend if backend is not None else Pyttsx3Backend()
+        self.cache_path = cache_path
+        self.phrases = phrases
+        self.max_pending = max_pending
+        self.repeat_after = repeat_after
+        self.pending = collections.deque()
+        self.last_spoken = {}
+        self.spoken = 0
+        self.dropped = 0
+        self._cond = threading.Condition()
+        self._running = True
+        self._busy = False
+        self._thread = threading.Thread(target=self._run, name="speech", daemon=True)
+        self._thread.start()
+
+    def say(self, text):
+        text = str(text).strip()
+        if not text:
+            return
+        with self._cond:
+            recent = time.monotonic() - self.last_spoken.get(text, float("-inf")) < self.repeat_after
+            if text in self.pending or recent:
+                self.dropped += 1
+                return
+            self.pending.append(text)
+            while len(self.pending) > self.max_pending:
+                self.pending.popleft()
+                self.dropped += 1
+            self._cond.notify()
+
+    __call__ = say
+
+    def wait(self, timeout=None):
+        """Block until the queue is empty; for scripts that exit right after speaking"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self.pending or self._busy:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def close(self):
+        with self._cond:
+            self._running = False
+            self.pending.clear()
+            self._cond.notify_all()
+        self._thread.join(timeout=5)
+
+    def _cached_file(self, text):
+        digest = hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+        return os.path.join(self.cache_path, digest + ".wav")
+
+    def _prerender(self):
+        if winsound is None or not self.cache_path:
+            return
+        os.makedirs(self.cache_path, exist_ok=True)
+        for text in self.phrases:
+            with self._cond:
+                if not self._running or self.pending:
+                    # speaking comes first, the rest is rendered next start
+                    return
+            fileName = self._cached_file(text)
+            if not os.path.exists(fileName):
+                try:
+                    self.backend.render(text, fileName)
+                except Exception as e:
+                    print(f"Cannot render speech cache: {e}")
+                    return
+
+    def _play(self, text):
+        fileName = self._cached_file(text) if self.cache_path else None
+        if winsound is not None and fileName and os.path.exists(fileName):
+            winsound.PlaySound(fileName, winsound.SND_FILENAME)
+        else:
+            self.backend.speak(text)
+
+    def _run(self):
+        try:
+            self.backend.open()
+        except Exception as e:
+            print(f"Text to speech unavailable: {e}")
+            self.backend = NullBackend()
+        self._prerender()
+        while True:
+            with self._cond:
+                self._busy = False
+                self._cond.notify_all()
+                while self._running and not self.pending:
+                    self._cond.wait()
+                if not self._running:
+                    break
+                text = self.pending.popleft()
+                self._busy = True
+                self.last_spoken[text] = time.monotonic()
+            try:
+                self._play(text)
+                self.spoken += 1
+            except Exception as e:
+                print(f"Text to speech failed: {e}")
+        self.backend.close()
+
+
+_service = None
+_lock = threading.Lock()
+
+
+def get_speech():
+    """Shared speech service; AMS_SPEECH=0 selects the silent backend"""
+    global _service
+    with _lock:
+        if _service is None:
+            silent = os.environ.get("AMS_SPEECH", "1").lower() in ("0", "off", "false", "no")
+            _service = SpeechService(NullBackend() if silent else None)
+        return _service
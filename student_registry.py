@@ -0,0 +1,110 @@
+import csv
+import os
+import re
+import threading
+
+
+studentdetail_path = os.path.join("StudentDetails", "studentdetails.csv")
+
+# Older attendance sheets stored names as "['Name']"
+_BRACKETS = re.compile(r"[\[\]'\"]")
+
+
+def normalize_enrollment(enrollment):
+    """Enrollment numbers are compared as ints, anything else as stripped text"""
+    text = str(enrollment).strip()
+    try:
+        return int(text)
+    except ValueError:
+        try:
+            return int(float(text))
+        except ValueError:
+            return text
+
+
+def clean_name(name):
+    return _BRACKETS.sub("", str(name)).strip()
+
+
+class StudentRegistry:
+    """Enrollment -> name index over studentdetails.csv, loaded once.
+
+    Lookups are dict lookups and always return a plain string, so names no
+    longer leak NumPy brackets into the attendance sheets.
+    """
+
+    def __init__(self, path=studentdetail_path):
+        self.path = path
+        self.names = {}
+        self.mtime = None
+        self.load()
+
+    def load(self):
+        names = {}
+        mtime = None
+        if os.path.exists(self.path):
+            mtime = os.path.getmtime(self.path)
+            with open(self.path, newline="") as f:
+                for row in csv.reader(f):
+                    if len(row) < 2 or not row[0].strip():
+                        continue
+                    enrollment = normalize_enrollment(row[0])
+                    # skip the "Enrollment,Name" header
+                    if not isinstance(enrollment, int):
+                        continue
+                    names[enrollment] = clean_name(row[1])
+        self.names = names
+        self.mtime = mtime
+
+    def is_stale(self):
+        try:
+            return os.path.getmtime(self.path) != self.mtime
+        except OSError:
+            return self.mtime is not None
+
+    def name(self, enrollment, default=""):
+        return self.names.get(normalize_enrollment(enrollment), default)
+
+    def name_series(self, enrollments, fallback=None):
+        """Names for a pandas Series of enrollments, for the viewers.
+
+        Unknown enrollments take the cleaned value from fallback if given.
+        """
+        result = enrollments.map(lambda e: self.names.get(normalize_enrollment(e)))
+        if fallback is not None:
+            result = result.fillna(fallback.fillna("").map(clean_name))
+        return result.fillna("")
+
+    def add(self, enrollment, name):
+        """Append a student to studentdetails.csv and the index"""
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        new_file = not os.path.exists(self.path)
+        with open(self.path, "a+", newline="") as csvFile:
+            writer = csv.writer(csvFile)
+            if new_file:
+                writer.writerow(["Enrollment", "Name"])
+            writer.writerow([enrollment, name])
+        self.names[normalize_enrollment(enrollment)] = clean_name(name)
+        self.mtime = os.path.getmtime(self.path)
+
+    def __contains__(self, enrollment):
+        return normalize_enrollment(enrollment) in self.names
+
+    def __len__(self):
+        return len(self.names)
+
+
+_registries = {}
+_lock = threading.Lock()
+
+
+def get_registry(path=studentdetail_path):
+    """Shared registry for a details file, reloaded when the file changes"""
+    key = os.path.abspath(path)
+    with _lock:
+        registry = _registries.get(key)
+        if registry is None:
+            registry = _registries[key] = StudentRegistry(path)
+        elif registry.is_stale():
+            registry.load()
+        return registry
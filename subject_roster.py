@@ -0,0 +1,72 @@
+import argparse
+import csv
+import os
+
+from student_registry import normalize_enrollment
+
+
+rosters_path = os.path.join("StudentDetails", "rosters")
+
+
+def roster_file(subject, path=rosters_path):
+    return os.path.join(path, f"{subject}.csv")
+
+
+def load_roster(subject, path=rosters_path):
+    """Enrollments of the students taking a subject, None when it has no roster"""
+    fileName = roster_file(subject, path)
+    if not os.path.exists(fileName):
+        return None
+    roster = set()
+    with open(fileName, newline="") as f:
+        for row in csv.reader(f):
+            if not row or not row[0].strip():
+                continue
+            enrollment = normalize_enrollment(row[0])
+            # skip the "Enrollment" header
+            if isinstance(enrollment, int):
+                roster.add(enrollment)
+    return frozenset(roster)
+
+
+def save_roster(subject, enrollments, path=rosters_path):
+    os.makedirs(path, exist_ok=True)
+    with open(roster_file(subject, path), "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Enrollment"])
+        for enrollment in sorted({normalize_enrollment(e) for e in enrollments}, key=str):
+            writer.writerow([enrollment])
+
+
+def roster_from_attendance(subject, store):
+    """Everyone who has attended the subject so far"""
+    df = store.query(subject)
+    return set(df["Enrollment"].map(normalize_enrollment))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Subject rosters: recognition only compares faces with the students of the subject"
+    )
+    parser.add_argument("subject")
+    parser.add_argument("enrollments", nargs="*", help="students to add to the roster")
+    parser.add_argument("--from-attendance", action="store_true",
+                        help="add everyone in the subject's stored attendance")
+    parser.add_argument("--replace", action="store_true", help="start from an empty roster")
+    args = parser.parse_args()
+
+    roster = set() if args.replace else set(load_roster(args.subject) or ())
+    roster.update(normalize_enrollment(e) for e in args.enrollments)
+    if args.from_attendance:
+        from attendance_store import get_store
+
+        roster.update(roster_from_attendance(args.subject, get_store()))
+    if args.enrollments or args.from_attendance or args.replace:
+        save_roster(args.subject, roster)
+    print(f"{args.subject}: {len(roster)} students")
+    for enrollment in sorted(roster, key=str):
+        print(enrollment)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,20 @@
-import csv
 import os, cv2
 import numpy as np
 import pandas as pd
 import datetime
 import time
 
+from face_archive import FaceArchiveWriter
+from frame_sources import open_source
+from metrics import Metrics
+from sample_capture import ImageWriter, SampleGate
+from student_registry import get_registry
+from trainImage import FACE_SIZE, preprocess_face
 
 
 # take Image of user
-def TakeImage(l1, l2, haarcasecade_path, trainimage_path, message, err_screen, text_to_speech):
+def TakeImage(l1, l2, haarcasecade_path, trainimage_path, message, err_screen, text_to_speech,
+              source=0, packed=False):
     # Input validation
     if not l1 and not l2:
         t = 'Please Enter your Enrollment Number and Name.'
@@ -23,11 +29,16 @@ def TakeImage(l1, l2, haarcasecade_path, trainimage_path, message, err_screen, t
         text_to_speech(t)
         return
 
+    metrics = Metrics("registration")
     try:
-        # Initialize camera with faster setup
-        cam = cv2.VideoCapture(0, cv2.CAP_DSHOW)  # CAP_DSHOW for faster initialization on Windows
-        cam.set(cv2.CAP_PROP_FRAME_WIDTH, 640)  # Reduced resolution for faster processing
-        cam.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
+        # Initialize camera with faster setup, or a network camera when source is a URL
+        with metrics.time("open"):
+            cam = open_source(
+                source,
+                api=cv2.CAP_DSHOW,  # CAP_DSHOW for faster initialization on Windows
+                width=640,  # Reduced resolution for faster processing
+                height=480,
+            )
         
         if not cam.isOpened():
             raise RuntimeError("Camera not opened")
@@ -43,34 +54,67 @@ def TakeImage(l1, l2, haarcasecade_path, trainimage_path, message, err_screen, t
         if not os.path.exists(path):
             os.makedirs(path)
         
+        # JPEGs are written in the background, only sharp and distinct crops are kept
+        writer = ImageWriter()
+        gate = SampleGate()
+        # packed: training crops go into one archive instead of one JPEG each;
+        # registering again replaces the samples, like the JPEGs it overwrites
+        archive = FaceArchiveWriter(
+            path, Enrollment, Name, FACE_SIZE, replace=True
+        ) if packed else None
+
         # Capture loop
         while sampleNum < 20:  # Reduced from 50 to 20
-            ret, img = cam.read()
+            with metrics.time("read"):
+                ret, img = cam.read()
             if not ret:
                 break
                 
-            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-            faces = detector.detectMultiScale(gray, 1.3, 5)
+            with metrics.time("convert"):
+                gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+            with metrics.time("detect"):
+                faces = detector.detectMultiScale(gray, 1.3, 5)
             
             for (x, y, w, h) in faces:
+                face = gray[y:y+h, x:x+w]
+                with metrics.time("gate"):
+                    # packed crops get the training-time detection now, like
+                    # loose images at training and pack_training_images
+                    crop = preprocess_face(face, detector) if archive is not None else None
+                    keep = (archive is None or crop is not None) and gate.accept(face)
+                if not keep:
+                    cv2.rectangle(img, (x, y), (x + w, y + h), (0, 165, 255), 2)
+                    continue
                 cv2.rectangle(img, (x, y), (x + w, y + h), (255, 0, 0), 2)
                 sampleNum += 1
-                cv2.imwrite(
-                    os.path.join(path, f"{Name}_{Enrollment}_{sampleNum}.jpg"),
-                    gray[y:y+h, x:x+w]
-                )
+                with metrics.time("save"):
+                    if archive is not None:
+                        archive.add(crop)
+                    else:
+                        writer.write(
+                            os.path.join(path, f"{Name}_{Enrollment}_{sampleNum}.jpg"),
+                            face
+                        )
+            with metrics.time("display"):
                 cv2.imshow("Frame", img)
+                key = cv2.waitKey(1) & 0xFF
                 
-            if cv2.waitKey(1) & 0xFF == ord("q"):
+            if key == ord("q"):
                 break
                 
         cam.release()
         cv2.destroyAllWindows()
+        with metrics.time("flush"):
+            writer.close()
+            if archive is not None:
+                archive.close()
+        print(f"Registration: {gate.report()}")
+        metrics.count("samples", sampleNum)
+        metrics.count("blurry", gate.blurry)
+        metrics.count("similar", gate.similar)
         
         # Save student details
-        with open("StudentDetails/studentdetails.csv", "a+", newline='') as csvFile:
-            writer = csv.writer(csvFile)
-            writer.writerow([Enrollment, Name])
+        get_registry().add(Enrollment, Name)
         
         res = f"Images Saved for ER No: {Enrollment} Name: {Name}"
         message.configure(text=res)
@@ -80,4 +124,5 @@ def TakeImage(l1, l2, haarcasecade_path, trainimage_path, message, err_screen, t
         F = "Student Data already exists"
         text_to_speech(F)
     except Exception as e:
-        text_to_speech(f"An error occurred: {str(e)}")
\ No newline at end of file
+        text_to_speech(f"An error occurred: {str(e)}")
+    metrics.write()
\ No newline at end of file
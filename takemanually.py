@@ -6,6 +6,8 @@ import datetime
 import time
 from typing import List, Dict
 
+from attendance_store import get_store
+
 # Global variables
 ts = time.time()
 current_date = datetime.datetime.fromtimestamp(ts).strftime("%Y-%m-%d")
@@ -91,31 +93,36 @@ class AttendanceSystem:
         attendance_dir = "Attendance"
         os.makedirs(attendance_dir, exist_ok=True)
 
-        # Create safe filename
+        # Create safe subject name
         safe_subject = "".join(
             c for c in subject if c.isalnum() or c in (' ', '_')
         ).rstrip()
-        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = os.path.join(attendance_dir, f"{safe_subject}_{timestamp}.csv")
 
         try:
             # Create DataFrame with proper types
             df = pd.DataFrame(
                 self.attendance_records,
                 columns=['Enrollment', 'Name', 'Date', 'Status'],
-                dtype={'Enrollment': str, 'Name': str}
-            )
+            ).astype({'Enrollment': str, 'Name': str})
             
             # Final validation
             if df.isnull().values.any() or df['Name'].str.strip().eq('').any():
                 messagebox.showerror("Error", "Invalid data detected - not saving")
                 return
 
-            # Save to CSV
-            df.to_csv(filename, index=False)
+            # Save to the attendance store as one session
+            store = get_store(os.path.join(attendance_dir, "attendance.db"))
+            store.add_session(
+                safe_subject,
+                datetime.datetime.now(),
+                [
+                    (row.Enrollment, row.Name, row.Status, None, None)
+                    for row in df.itertuples(index=False)
+                ],
+            )
             messagebox.showinfo(
                 "Success", 
-                f"Saved {len(df)} records to:\n{filename}"
+                f"Saved {len(df)} records of {safe_subject} to:\n{store.path}"
             )
             os.startfile(attendance_dir)
         except Exception as e:
@@ -0,0 +1,89 @@
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import cv2
+import numpy as np
+
+from frame_sources import NetworkCameraSource
+
+
+def jpeg(value):
+    ok, buf = cv2.imencode(".jpg", np.full((48, 64, 3), value, dtype=np.uint8))
+    return buf.tobytes()
+
+
+class CameraHandler(BaseHTTPRequestHandler):
+    """Stand-in for the IP Webcam app: /video is MJPEG, /shot.jpg one snapshot"""
+
+    def do_GET(self):
+        if self.path == "/shot.jpg":
+            body = jpeg(200)
+            self.send_response(200)
+            self.send_header("Content-Type", "image/jpeg")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        elif self.path == "/video":
+            self.send_response(200)
+            self.send_header("Content-Type", "multipart/x-mixed-replace; boundary=frame")
+            self.end_headers()
+            for value in (50, 100, 150):
+                part = jpeg(value)
+                self.wfile.write(
+                    b"--frame\r\nContent-Type: image/jpeg\r\n"
+                    + f"Content-Length: {len(part)}\r\n\r\n".encode()
+                    + part
+                    + b"\r\n"
+                )
+                self.wfile.flush()
+        else:
+            self.send_error(404)
+
+    def log_message(self, *args):
+        pass
+
+
+class NetworkCameraSourceTest(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), CameraHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def read_frame(self, path):
+        cam = NetworkCameraSource(self.base + path, timeout=2.0)
+        try:
+            return cam.read()
+        finally:
+            cam.release()
+
+    def test_mjpeg_stream(self):
+        ret, frame = self.read_frame("/video")
+        self.assertTrue(ret)
+        self.assertEqual(frame.shape, (48, 64, 3))
+        # one of the streamed frames, JPEG keeps flat colors within a few levels
+        self.assertTrue(any(abs(int(frame.mean()) - value) <= 3 for value in (50, 100, 150)))
+
+    def test_snapshot(self):
+        ret, frame = self.read_frame("/shot.jpg")
+        self.assertTrue(ret)
+        self.assertEqual(frame.shape, (48, 64, 3))
+        self.assertLessEqual(abs(int(frame.mean()) - 200), 3)
+
+    def test_missing_camera(self):
+        cam = NetworkCameraSource(self.base + "/missing", timeout=0.5)
+        try:
+            ret, frame = cam.read()
+        finally:
+            cam.release()
+        self.assertFalse(ret)
+        self.assertIsNone(frame)
+        self.assertGreater(cam.errors, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
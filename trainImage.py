@@ -1,125 +1,414 @@
 import csv
+import json
 import os, cv2
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
 import pandas as pd
 import datetime
 import time
 from PIL import ImageTk, Image
 
+from face_archive import archive_state, has_archive, read_archive, sample_index
+from face_cache import FaceCache
+from metrics import Metrics, metrics_path
+from lbph_matcher import export_model, model_bin_path
+from student_registry import get_registry, studentdetail_path
+
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+MAX_IMAGES_PER_STUDENT = 20
+FACE_SIZE = (200, 200)
+# Haar settings used to find the face in a stored training image
+DETECT_PARAMS = {"scaleFactor": 1.05, "minNeighbors": 4, "minSize": (60, 60)}
+
+
+def create_recognizer():
+    """LBPH recognizer with the parameters the saved model is trained with"""
+    return cv2.face.LBPHFaceRecognizer_create(
+        radius=2,
+        neighbors=8,
+        grid_x=6,
+        grid_y=6,
+        threshold=80.0
+    )
+
+
+def list_student_dirs(trainimage_path):
+    """Sorted (student_id, student_dir, student_path) for every <enrollment>_<name> folder"""
+    students = []
+    for student_dir in sorted(os.listdir(trainimage_path)):
+        student_path = os.path.join(trainimage_path, student_dir)
+
+        if not os.path.isdir(student_path) or '_' not in student_dir:
+            continue
+
+        try:
+            enrollment = student_dir.split('_')[0]
+            student_id = int(enrollment)
+        except (IndexError, ValueError):
+            continue
+
+        students.append((student_id, student_dir, student_path))
+    return students
+
+
+def list_student_images(student_path):
+    """The image files (or packed archive samples) of one student that are used for training"""
+    if has_archive(student_path):
+        return list(archive_state(student_path))[:MAX_IMAGES_PER_STUDENT]
+    return sorted([f for f in os.listdir(student_path)
+                   if f.lower().endswith(IMAGE_EXTENSIONS)])[:MAX_IMAGES_PER_STUDENT]
+
+
+def preprocess_face(image, detector):
+    """Detect the single face in a grayscale image and return the 200x200 training crop"""
+    face_rects = detector.detectMultiScale(image, **DETECT_PARAMS)
+
+    if len(face_rects) != 1:
+        return None
+    x, y, w, h = face_rects[0]
+    return training_crop(image[y:y+h, x:x+w])
+
+
+def training_crop(face_img):
+    """Equalized FACE_SIZE crop of a face that has already been located"""
+    face_img = cv2.equalizeHist(face_img)
+    return cv2.resize(face_img, FACE_SIZE)
+
+
+def open_face_cache(cache_dir, haarcasecade_path):
+    """Preprocessed-face cache tied to the detector file and preprocessing settings"""
+    params = dict(DETECT_PARAMS, size=FACE_SIZE, equalize=True)
+    try:
+        params["cascade"] = [os.path.abspath(haarcasecade_path)] + image_fingerprint(haarcasecade_path)
+    except OSError:
+        params["cascade"] = haarcasecade_path
+    return FaceCache(cache_dir, params)
+
+
+def face_cache_dir(trainimagelabel_path):
+    return os.path.join(os.path.dirname(trainimagelabel_path) or ".", "FaceCache")
+
+
+def load_archive_faces(student_path, sample_keys):
+    """Preprocessed crops straight from a student's packed archive"""
+    archive, _ = read_archive(student_path)
+    faces = []
+    for key in sample_keys:
+        index = sample_index(key)
+        if index >= len(archive):
+            continue
+        face_img = np.array(archive[index])
+        if face_img.shape != (FACE_SIZE[1], FACE_SIZE[0]):
+            face_img = cv2.resize(face_img, FACE_SIZE)
+        faces.append(face_img)
+    return faces
+
+
+def load_student_faces(student_path, image_files, detector, cache=None):
+    """Decode and preprocess the given images of one student.
+
+    With a cache, images whose size and mtime are unchanged are taken from the
+    stored crops and are neither decoded nor run through the detector. A
+    packed archive already holds preprocessed crops and is read as is.
+    """
+    if has_archive(student_path):
+        return load_archive_faces(student_path, image_files)
+    student_dir = os.path.basename(student_path)
+    entries = cache.load(student_dir) if cache else {}
+    changed = False
+    faces = []
+    for image_file in image_files:
+        image_path = os.path.join(student_path, image_file)
+        fingerprint = image_fingerprint(image_path)
+        cached = entries.get(image_file)
+        if cached is not None and cached[0] == fingerprint:
+            face_img = cached[1]
+            if cache:
+                cache.hits += 1
+        else:
+            image = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
+            face_img = None if image is None else preprocess_face(image, detector)
+            entries[image_file] = (fingerprint, face_img)
+            changed = True
+            if cache:
+                cache.misses += 1
+
+        if face_img is not None:
+            faces.append(face_img)
+
+    if cache and changed:
+        # Forget images that were deleted from the folder
+        existing = set(os.listdir(student_path))
+        entries = {f: entry for f, entry in entries.items() if f in existing}
+        cache.save(student_dir, entries, FACE_SIZE)
+    return faces
+
+
+# Per-process detector and cache for parallel preprocessing
+_worker_detector = None
+_worker_cache = None
+
+
+def _init_worker(haarcasecade_path, cache_dir):
+    global _worker_detector, _worker_cache
+    _worker_detector = cv2.CascadeClassifier(haarcasecade_path)
+    _worker_cache = open_face_cache(cache_dir, haarcasecade_path) if cache_dir else None
+
+
+def _load_student_job(job):
+    student_path, image_files = job
+    cache = _worker_cache
+    hits, misses = (cache.hits, cache.misses) if cache else (0, 0)
+    faces = load_student_faces(student_path, image_files, _worker_detector, cache)
+    if cache:
+        return faces, cache.hits - hits, cache.misses - misses
+    return faces, 0, 0
+
+
+def collect_faces(jobs, haarcasecade_path, detector, cache=None, workers=1):
+    """Preprocess [(student_id, student_path, image_files), ...] into faces and ids.
+
+    With workers > 1 the student folders are spread over a process pool. Results
+    are merged in job order, so the samples are the same as in a serial run.
+    """
+    faces, ids = [], []
+    if workers > 1 and len(jobs) > 1:
+        cache_dir = cache.cache_dir if cache else None
+        chunksize = max(1, len(jobs) // (workers * 4))
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(haarcasecade_path, cache_dir),
+        ) as executor:
+            results = executor.map(
+                _load_student_job,
+                [(student_path, image_files) for _, student_path, image_files in jobs],
+                chunksize=chunksize,
+            )
+            for (student_id, _, _), (student_faces, hits, misses) in zip(jobs, results):
+                faces.extend(student_faces)
+                ids.extend([student_id] * len(student_faces))
+                if cache:
+                    cache.hits += hits
+                    cache.misses += misses
+    else:
+        for student_id, student_path, image_files in jobs:
+            student_faces = load_student_faces(student_path, image_files, detector, cache)
+            faces.extend(student_faces)
+            ids.extend([student_id] * len(student_faces))
+    return faces, ids
+
+
+def save_model(recognizer, trainimagelabel_path):
+    """Write the model next to its final name and swap it in, so readers never see half a file"""
+    os.makedirs(os.path.dirname(trainimagelabel_path) or ".", exist_ok=True)
+    root, ext = os.path.splitext(trainimagelabel_path)
+    tmp_path = root + ".tmp" + ext
+    recognizer.save(tmp_path)
+    os.replace(tmp_path, trainimagelabel_path)
+    # memory-mappable copy that sessions load instead of parsing the YAML
+    try:
+        export_model(recognizer, model_bin_path(trainimagelabel_path))
+    except OSError as e:
+        # e.g. a session still maps the old copy on Windows; being older
+        # than the YAML it is ignored, and the next load exports it again
+        print(f"Binary model not updated: {e}")
+
+
+def image_fingerprint(image_path):
+    stat = os.stat(image_path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def training_state_path(trainimagelabel_path):
+    """Record of the images already in the model, stored next to it"""
+    return os.path.splitext(trainimagelabel_path)[0] + "_images.json"
+
+
+def load_training_state(trainimagelabel_path):
+    try:
+        with open(training_state_path(trainimagelabel_path)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_training_state(trainimagelabel_path, state):
+    with open(training_state_path(trainimagelabel_path), "w") as f:
+        json.dump(state, f)
+
+
+def scan_training_images(trainimage_path):
+    """Current {student_dir: {image_file: fingerprint}} of the TrainingImage tree"""
+    state = {}
+    for student_id, student_dir, student_path in list_student_dirs(trainimage_path):
+        if has_archive(student_path):
+            samples = archive_state(student_path)
+            state[student_dir] = {key: samples[key] for key in list_student_images(student_path)}
+            continue
+        state[student_dir] = {
+            image_file: image_fingerprint(os.path.join(student_path, image_file))
+            for image_file in list_student_images(student_path)
+        }
+    return state
+
+
+def plan_incremental_update(trained, current):
+    """Images that are new since the last training run.
+
+    Returns None when an image that is already in the model was changed or
+    removed: LBPH cannot forget samples, so that needs a full rebuild.
+    """
+    new_images = {}
+    for student_dir, trained_images in trained.items():
+        current_images = current.get(student_dir, {})
+        for image_file, fingerprint in trained_images.items():
+            if current_images.get(image_file) != fingerprint:
+                return None
+
+    for student_dir, current_images in current.items():
+        trained_images = trained.get(student_dir, {})
+        added = [f for f in current_images if f not in trained_images]
+        if added:
+            new_images[student_dir] = added
+    return new_images
+
 
 # Train Image
-def TrainImage(haarcasecade_path, trainimage_path, trainimagelabel_path, message, text_to_speech):
+def TrainImage(haarcasecade_path, trainimage_path, trainimagelabel_path, message, text_to_speech,
+               full_rebuild=False, workers=1, details_path=studentdetail_path,
+               metrics_path=metrics_path):
+    metrics = Metrics("training")
     try:
-        # Initialize LBPH Recognizer
-        recognizer = cv2.face.LBPHFaceRecognizer_create(
-            radius=2,
-            neighbors=8,
-            grid_x=6, 
-            grid_y=6,
-            threshold=80.0
-        )
-        
         # Load face detector
-        detector = cv2.CascadeClassifier(haarcasecade_path)
+        with metrics.time("load_detector"):
+            detector = cv2.CascadeClassifier(haarcasecade_path)
         if detector.empty():
             raise ValueError("Failed to load face detection model")
-        
-        faces, ids = [], []
-        print("Collecting training images...")
-        
-        # Process each student's directory
-        for student_dir in os.listdir(trainimage_path):
-            student_path = os.path.join(trainimage_path, student_dir)
-            
-            if not os.path.isdir(student_path) or '_' not in student_dir:
-                continue
-                
-            try:
-                enrollment = student_dir.split('_')[0]
-                student_id = int(enrollment)
-            except (IndexError, ValueError):
-                continue
-                
-            # Process images
-            image_files = sorted([f for f in os.listdir(student_path) 
-                               if f.lower().endswith(('.png', '.jpg', '.jpeg'))])[:20]
-                               
-            for image_file in image_files:
-                image_path = os.path.join(student_path, image_file)
-                image = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
-                if image is None:
-                    continue
-                    
-                face_rects = detector.detectMultiScale(
-                    image, 
-                    scaleFactor=1.05,
-                    minNeighbors=4,
-                    minSize=(60, 60)
-                )
-                
-                if len(face_rects) == 1:
-                    x, y, w, h = face_rects[0]
-                    face_img = image[y:y+h, x:x+w]
-                    face_img = cv2.equalizeHist(face_img)
-                    face_img = cv2.resize(face_img, (200, 200))
-                    faces.append(face_img)
-                    ids.append(student_id)
-        
-        # Validation
-        if len(faces) < 10:
-            raise ValueError(f"Only {len(faces)} valid faces found - need more training data")
-        if len(set(ids)) < 2:
-            raise ValueError("Need at least 2 different students for training")
-        
-        # Train and save
-        print(f"Training with {len(set(ids))} students and {len(faces)} samples...")
-        recognizer.train(faces, np.array(ids))
-        os.makedirs(os.path.dirname(trainimagelabel_path), exist_ok=True)
-        recognizer.save(trainimagelabel_path)
-        
-        res = f"Trained {len(set(ids))} students with {len(faces)} total samples"
+
+        cache = open_face_cache(face_cache_dir(trainimagelabel_path), haarcasecade_path)
+        with metrics.time("scan"):
+            current = scan_training_images(trainimage_path)
+        registry = get_registry(details_path)
+        unregistered = [
+            student_dir for student_id, student_dir, _ in list_student_dirs(trainimage_path)
+            if student_id not in registry
+        ]
+        if unregistered:
+            print(f"Not in student details, names will be missing: {', '.join(unregistered)}")
+        trained = None
+        if not full_rebuild and os.path.exists(trainimagelabel_path):
+            trained = load_training_state(trainimagelabel_path)
+
+        new_images = None
+        if trained is not None:
+            new_images = plan_incremental_update(trained, current)
+            if new_images is None:
+                print("Trained images changed or were removed - rebuilding the model")
+
+        if new_images is not None:
+            res = _update_model(
+                detector, haarcasecade_path, trainimage_path, trainimagelabel_path,
+                new_images, cache, workers, metrics
+            )
+        else:
+            res = _train_model(
+                detector, haarcasecade_path, trainimage_path, trainimagelabel_path,
+                current, cache, workers, metrics
+            )
+        save_training_state(trainimagelabel_path, current)
+        print(f"Face cache: {cache.hits} reused, {cache.misses} preprocessed")
+        metrics.count("cache_hits", cache.hits)
+        metrics.count("cache_misses", cache.misses)
+
         if message:
             message.configure(text=res)
         text_to_speech("Training completed successfully")
-        
+
     except Exception as e:
         error_msg = f"Training Error: {str(e)}"
         print(error_msg)
         if message:
             message.configure(text=error_msg)
         text_to_speech("Training failed. Please check console for details.")
+        metrics.count("failed")
+    metrics.write(metrics_path)
+
+
+def _train_model(detector, haarcasecade_path, trainimage_path, trainimagelabel_path, current,
+                 cache=None, workers=1, metrics=None):
+    """Full rebuild of the LBPH model from every student folder"""
+    # Initialize LBPH Recognizer
+    recognizer = create_recognizer()
+
+    print(f"Collecting training images with {workers} worker(s)...")
+
+    # Process each student's directory
+    jobs = [
+        (student_id, student_path, list(current[student_dir]))
+        for student_id, student_dir, student_path in list_student_dirs(trainimage_path)
+    ]
+    metrics = metrics or Metrics("training")
+    with metrics.time("collect"):
+        faces, ids = collect_faces(jobs, haarcasecade_path, detector, cache, workers)
+    metrics.count("samples", len(faces))
+
+    # Validation
+    if len(faces) < 10:
+        raise ValueError(f"Only {len(faces)} valid faces found - need more training data")
+    if len(set(ids)) < 2:
+        raise ValueError("Need at least 2 different students for training")
+
+    # Train and save
+    print(f"Training with {len(set(ids))} students and {len(faces)} samples...")
+    with metrics.time("train"):
+        recognizer.train(faces, np.array(ids))
+    with metrics.time("save"):
+        save_model(recognizer, trainimagelabel_path)
+
+    return f"Trained {len(set(ids))} students with {len(faces)} total samples"
+
+
+def _update_model(detector, haarcasecade_path, trainimage_path, trainimagelabel_path, new_images,
+                  cache=None, workers=1, metrics=None):
+    """Add only the new images to the saved model with LBPH update()"""
+    if not new_images:
+        return "Model is already up to date"
 
+    print(f"Collecting new images for {len(new_images)} students...")
+    jobs = [
+        (student_id, student_path, new_images[student_dir])
+        for student_id, student_dir, student_path in list_student_dirs(trainimage_path)
+        if student_dir in new_images
+    ]
+    metrics = metrics or Metrics("training")
+    with metrics.time("collect"):
+        faces, ids = collect_faces(jobs, haarcasecade_path, detector, cache, workers)
+    metrics.count("samples", len(faces))
 
-def getImagesAndLabels(path):
+    if not faces:
+        return "No valid faces found in the new images"
+
+    recognizer = create_recognizer()
+    with metrics.time("read_model"):
+        recognizer.read(trainimagelabel_path)
+    print(f"Updating model with {len(set(ids))} students and {len(faces)} samples...")
+    with metrics.time("train"):
+        recognizer.update(faces, np.array(ids))
+    with metrics.time("save"):
+        save_model(recognizer, trainimagelabel_path)
+
+    return f"Added {len(set(ids))} students with {len(faces)} new samples"
+
+
+def getImagesAndLabels(path, cache_dir=None):
     """Alternative implementation that matches TrainImage's preprocessing"""
-    detector = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
-    faces = []
-    ids = []
-    
-    for student_dir in os.listdir(path):
-        student_path = os.path.join(path, student_dir)
-        if not os.path.isdir(student_path) or '_' not in student_dir:
-            continue
-            
-        try:
-            student_id = int(student_dir.split('_')[0])
-        except (IndexError, ValueError):
-            continue
-            
-        for image_file in os.listdir(student_path)[:20]:  # Limit to 20 images
-            if not image_file.lower().endswith(('.png', '.jpg', '.jpeg')):
-                continue
-                
-            image_path = os.path.join(student_path, image_file)
-            image = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
-            if image is None:
-                continue
-                
-            face_rects = detector.detectMultiScale(image, 1.05, 4, minSize=(60, 60))
-            if len(face_rects) == 1:
-                x, y, w, h = face_rects[0]
-                face_img = cv2.resize(cv2.equalizeHist(image[y:y+h, x:x+w]), (200, 200))
-                faces.append(face_img)
-                ids.append(student_id)
-    
-    return faces, ids
\ No newline at end of file
+    haarcasecade_path = cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
+    detector = cv2.CascadeClassifier(haarcasecade_path)
+    cache = open_face_cache(cache_dir, haarcasecade_path) if cache_dir else None
+    jobs = [
+        (student_id, student_path, list_student_images(student_path))
+        for student_id, student_dir, student_path in list_student_dirs(path)
+    ]
+    return collect_faces(jobs, haarcasecade_path, detector, cache)
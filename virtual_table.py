@@ -0,0 +1,152 @@
+import tkinter as tk
+from tkinter import ttk
+
+import numpy as np
+import pandas as pd
+
+
+class VirtualTable(tk.Frame):
+    """ttk.Treeview that only holds the rows currently on screen.
+
+    The data stays in a DataFrame; the widget keeps one item per visible row
+    and refills their values as the user scrolls, so opening a table of a few
+    hundred thousand rows costs the same as opening one of twenty. Sorting
+    (click a heading) and filtering (filter_rows) work on an index array over
+    the frame with vectorized NumPy/pandas operations, never on widget items.
+    """
+
+    def __init__(self, master, df, col_widths=None, anchors=None, **kwargs):
+        super().__init__(master, **kwargs)
+        self.df = df.reset_index(drop=True)
+        self.columns = list(self.df.columns)
+        self.view = np.arange(len(self.df))
+        self.offset = 0
+        self.visible_rows = 20
+        self.sort_column = None
+        self.sort_descending = False
+        self._lower = {}
+
+        self.tree = ttk.Treeview(self, columns=self.columns, show="headings",
+                                 selectmode="browse")
+        self.vsb = ttk.Scrollbar(self, orient="vertical", command=self._on_scrollbar)
+        self.hsb = ttk.Scrollbar(self, orient="horizontal", command=self.tree.xview)
+        self.tree.configure(xscrollcommand=self.hsb.set)
+
+        self.tree.grid(row=0, column=0, sticky="nsew")
+        self.vsb.grid(row=0, column=1, sticky="ns")
+        self.hsb.grid(row=1, column=0, sticky="ew")
+        self.grid_rowconfigure(0, weight=1)
+        self.grid_columnconfigure(0, weight=1)
+
+        col_widths = col_widths or {}
+        anchors = anchors or {}
+        for col in self.columns:
+            self.tree.heading(col, text=col, command=lambda c=col: self.sort_by(c))
+            self.tree.column(col, width=col_widths.get(col, 100), anchor=anchors.get(col, "w"))
+
+        self.tree.bind("<Configure>", self._on_resize)
+        self.tree.bind("<MouseWheel>", self._on_wheel)
+        self.tree.bind("<Button-4>", lambda e: self.scroll(-3))
+        self.tree.bind("<Button-5>", lambda e: self.scroll(3))
+        self.tree.bind("<Prior>", lambda e: self.scroll(-self.visible_rows))
+        self.tree.bind("<Next>", lambda e: self.scroll(self.visible_rows))
+        self.refresh()
+
+    # -- data side -------------------------------------------------------
+
+    def sort_by(self, col):
+        """Sort the current view by a column; clicking again reverses it"""
+        if self.sort_column == col:
+            self.sort_descending = not self.sort_descending
+        else:
+            self.sort_column, self.sort_descending = col, False
+        self._apply_sort()
+        for c in self.columns:
+            arrow = ""
+            if c == col:
+                arrow = " ▼" if self.sort_descending else " ▲"
+            self.tree.heading(c, text=c + arrow)
+        self.offset = 0
+        self.refresh()
+
+    def _apply_sort(self):
+        if self.sort_column is None or not len(self.view):
+            return
+        keys = self.df[self.sort_column].to_numpy()[self.view]
+        try:
+            order = np.argsort(keys, kind="stable")
+        except TypeError:
+            # mixed types in an object column
+            order = np.argsort(keys.astype(str), kind="stable")
+        if self.sort_descending:
+            order = order[::-1]
+        self.view = self.view[order]
+
+    def filter_rows(self, text):
+        """Keep rows where any column contains text (case-insensitive)"""
+        text = text.strip().lower()
+        if not text:
+            self.view = np.arange(len(self.df))
+        else:
+            mask = np.zeros(len(self.df), dtype=bool)
+            for col in self.columns:
+                if col not in self._lower:
+                    self._lower[col] = self.df[col].astype(str).str.lower()
+                mask |= self._lower[col].str.contains(text, regex=False).to_numpy()
+            self.view = np.flatnonzero(mask)
+        self._apply_sort()
+        self.offset = 0
+        self.refresh()
+
+    def current_frame(self):
+        """The rows in their current filtered and sorted order"""
+        return self.df.iloc[self.view]
+
+    # -- widget side -----------------------------------------------------
+
+    def refresh(self):
+        total = len(self.view)
+        self.offset = max(0, min(self.offset, total - self.visible_rows))
+        rows = self.df.iloc[self.view[self.offset:self.offset + self.visible_rows]]
+        values = rows.to_numpy(dtype=object)
+
+        items = self.tree.get_children()
+        for i in range(len(values), len(items)):
+            self.tree.delete(items[i])
+        for i, row in enumerate(values):
+            row = ["" if pd.isna(v) else v for v in row]
+            if i < len(items):
+                self.tree.item(items[i], values=row)
+            else:
+                self.tree.insert("", tk.END, values=row)
+
+        if total:
+            self.vsb.set(self.offset / total, min(1.0, (self.offset + self.visible_rows) / total))
+        else:
+            self.vsb.set(0.0, 1.0)
+        self.event_generate("<<TableRefreshed>>")
+
+    def scroll(self, rows):
+        self.offset += rows
+        self.refresh()
+
+    def _on_scrollbar(self, action, value, unit=None):
+        if action == "moveto":
+            self.offset = int(float(value) * len(self.view))
+        elif action == "scroll":
+            step = self.visible_rows if unit == "pages" else 1
+            self.offset += int(value) * step
+        self.refresh()
+
+    def _on_wheel(self, event):
+        self.scroll(-3 if event.delta > 0 else 3)
+        return "break"
+
+    def _on_resize(self, event):
+        style = ttk.Style(self)
+        row_height = int(style.lookup("Treeview", "rowheight") or 20)
+        # leave room for the heading row
+        rows = max(1, (event.height - row_height - 4) // row_height)
+        if rows != self.visible_rows:
+            self.visible_rows = rows
+            self.refresh()